@@ -3,19 +3,21 @@ import streamlit as st
 import sqlite3
 import jwt
 import datetime
-import hashlib
 import re
 import time
-import bcrypt
+import html
 import secrets
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 import os
-from styles import CSS
 from templates import Templates
+import assets
+import database
 import readability
-import PyPDF2
+import readability_cache
+import pdf_extract
+import workers
+import rate_limit
+import mailer
+import passwords
 
 # ================= LOAD SECRETS FROM ENVIRONMENT =================
 EMAIL_ADDRESS = os.environ.get('EMAIL_ID')
@@ -35,68 +37,49 @@ st.set_page_config(
 )
 
 # ================= APPLY CSS =================
-st.markdown(CSS, unsafe_allow_html=True)
+# Minified once per process; each rerun reuses the same inline <style> string
+@st.cache_resource
+def get_stylesheet():
+    return assets.build_stylesheet()
+
+st.markdown(get_stylesheet(), unsafe_allow_html=True)
 
 # ================= CONFIG =================
 ALGORITHM = "HS256"
 TOKEN_EXPIRE_MINUTES = 30
+TOKEN_RECHECK_SECONDS = 60
 MAX_LOGIN_ATTEMPTS = 3
 LOCKOUT_TIME = 300
 OTP_EXPIRY_MINUTES = 10
+PASSWORD_HISTORY_DEPTH = int(os.environ.get('PASSWORD_HISTORY_DEPTH', 5))
+ADMIN_PAGE_SIZES = [25, 50, 100]
+HEATMAP_PAGE_SIZE = 100
+FTS_MIN_QUERY = 3
 
 # ================= DATABASE =================
-conn   = sqlite3.connect("users.db", check_same_thread=False)
-cursor = conn.cursor()
-
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS users (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    username TEXT NOT NULL,
-    email TEXT UNIQUE NOT NULL,
-    password TEXT NOT NULL,
-    security_question TEXT NOT NULL,
-    security_answer TEXT NOT NULL,
-    created_at TEXT,
-    is_blocked INTEGER DEFAULT 0
-)""")
-
-try:
-    cursor.execute("ALTER TABLE users ADD COLUMN is_blocked INTEGER DEFAULT 0")
-    conn.commit()
-except:
-    pass
-
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS password_history (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    email TEXT NOT NULL,
-    password TEXT NOT NULL,
-    set_at TEXT,
-    FOREIGN KEY(email) REFERENCES users(email)
-)""")
-
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS login_attempts (
-    email TEXT PRIMARY KEY,
-    attempts INTEGER DEFAULT 0,
-    last_attempt REAL
-)""")
-
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS otp_requests (
-    email TEXT PRIMARY KEY,
-    otp TEXT,
-    expires_at REAL
-)""")
-
-conn.commit()
+# The pool and schema migrations are set up once per process, not on every rerun
+@st.cache_resource
+def get_db():
+    return database.ConnectionPool("users.db")
+
+db = get_db()
+
+@st.cache_resource
+def get_readability_cache():
+    return readability_cache.ReadabilityCache()
+
+# One process pool for PDF extraction and large-document counting, started
+# once and reused (replaced if a worker crashes); its workers never import this script
+@st.cache_resource(validate=lambda pool: not pool.broken)
+def get_worker_pool():
+    return workers.WorkerPool()
 
 # ================= UTILITY FUNCTIONS =================
 def _get_timestamp():
     return datetime.datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
 
 def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
+    return passwords.hash_password(password)
 
 def create_token(email, username, role="user"):
     payload = {
@@ -110,7 +93,7 @@ def create_token(email, username, role="user"):
 def verify_token(token):
     try:
         return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-    except:
+    except jwt.InvalidTokenError:
         return None
 
 # ================= VALIDATION FUNCTIONS =================
@@ -142,29 +125,29 @@ def valid_username(username):
     return True, ""
 
 # ================= RATE LIMITING FUNCTIONS =================
+# Attempts are counted in memory and written behind to login_attempts
+@st.cache_resource
+def get_rate_limiter():
+    return rate_limit.LoginRateLimiter(db, MAX_LOGIN_ATTEMPTS, LOCKOUT_TIME)
+
+rate_limiter = get_rate_limiter()
+
+def _client_id():
+    # requires a Streamlit version that exposes st.context.ip_address
+    context = getattr(st, "context", None)
+    return getattr(context, "ip_address", None)
+
 def get_login_attempts(email):
-    cursor.execute("SELECT attempts, last_attempt FROM login_attempts WHERE email = ?", (email,))
-    data = cursor.fetchone()
-    return data if data else (0, 0)
+    return rate_limiter.attempts(email)
 
 def increment_login_attempts(email):
-    attempts, _ = get_login_attempts(email)
-    cursor.execute("INSERT OR REPLACE INTO login_attempts (email, attempts, last_attempt) VALUES (?, ?, ?)",
-                   (email, attempts + 1, time.time()))
-    conn.commit()
+    rate_limiter.record_failure(email, _client_id())
 
 def reset_login_attempts(email):
-    cursor.execute("DELETE FROM login_attempts WHERE email = ?", (email,))
-    conn.commit()
+    rate_limiter.reset(email)
 
 def is_rate_limited(email):
-    attempts, last_attempt = get_login_attempts(email)
-    if attempts >= MAX_LOGIN_ATTEMPTS:
-        if time.time() - last_attempt < LOCKOUT_TIME:
-            return True, LOCKOUT_TIME - (time.time() - last_attempt)
-        else:
-            reset_login_attempts(email)
-    return False, 0
+    return rate_limiter.is_limited(email, _client_id())
 
 # ================= USER MANAGEMENT FUNCTIONS =================
 def register_user(username, email, password, security_question, security_answer):
@@ -172,13 +155,10 @@ def register_user(username, email, password, security_question, security_answer)
         now = _get_timestamp()
         hashed_pass   = hash_password(password)
         hashed_answer = hash_password(security_answer.strip())
-        cursor.execute(
-            "INSERT INTO users (username, email, password, security_question, security_answer, created_at) VALUES (?, ?, ?, ?, ?, ?)",
-            (username, email, hashed_pass, security_question, hashed_answer, now)
-        )
-        cursor.execute("INSERT INTO password_history (email, password, set_at) VALUES (?, ?, ?)",
-                       (email, hashed_pass, now))
-        conn.commit()
+        with db.connection(write=True) as conn:
+            conn.execute(database.INSERT_USER_SQL,
+                         (username, email, hashed_pass, security_question, hashed_answer, now))
+            conn.execute(database.INSERT_HISTORY_SQL, (email, hashed_pass, now))
         return True
     except sqlite3.IntegrityError:
         return False
@@ -187,76 +167,125 @@ def authenticate_user(email, password):
     is_limited, _ = is_rate_limited(email)
     if is_limited:
         return False, "locked"
-    cursor.execute("SELECT username, password, is_blocked FROM users WHERE email = ?", (email,))
-    user = cursor.fetchone()
+    with db.connection() as conn:
+        user = conn.execute(database.AUTH_USER_SQL, (email,)).fetchone()
     if user:
         if user[2] == 1:
             return False, "blocked"
-        if user[1] == hash_password(password):
+        matches, needs_rehash = passwords.verify_password(password, user[1])
+        if matches:
+            if needs_rehash:
+                _rehash(email, "password", user[1], password)
             reset_login_attempts(email)
             return True, user[0]
     increment_login_attempts(email)
     return False, None
 
+def _rehash(email, column, old_hash, secret):
+    # legacy or lower-cost hash: store a current one now that we know the secret
+    with db.connection(write=True) as conn:
+        conn.execute(database.REHASH_SQL.format(column=column), (hash_password(secret), email, old_hash))
+
 def authenticate_admin(email, password):
     return email == ADMIN_EMAIL and password == ADMIN_PASSWORD
 
 def check_user_exists(email):
-    cursor.execute("SELECT 1 FROM users WHERE email = ?", (email,))
-    return cursor.fetchone() is not None
+    with db.connection() as conn:
+        return conn.execute(database.USER_EXISTS_SQL, (email,)).fetchone() is not None
 
 def get_user_details(email):
-    cursor.execute("SELECT username, security_question, security_answer FROM users WHERE email = ?", (email,))
-    return cursor.fetchone()
+    with db.connection() as conn:
+        return conn.execute(database.USER_DETAILS_SQL, (email,)).fetchone()
 
 def check_password_reused(email, new_password):
-    cursor.execute("SELECT password FROM password_history WHERE email = ? ORDER BY id DESC LIMIT 5", (email,))
-    history = cursor.fetchall()
-    hashed_new = hash_password(new_password)
-    for (stored_hash,) in history:
-        if stored_hash == hashed_new:
-            return True
-    return False
+    with db.connection() as conn:
+        history = conn.execute(database.PASSWORD_HISTORY_SQL, (email, PASSWORD_HISTORY_DEPTH)).fetchall()
+    return passwords.matches_any(new_password, [stored_hash for (stored_hash,) in history])
 
 def update_password(email, new_password):
     hashed = hash_password(new_password)
     now    = _get_timestamp()
-    cursor.execute("UPDATE users SET password = ? WHERE email = ?", (hashed, email))
-    cursor.execute("INSERT INTO password_history (email, password, set_at) VALUES (?, ?, ?)",
-                   (email, hashed, now))
-    conn.commit()
+    with db.connection(write=True) as conn:
+        conn.execute(database.SET_PASSWORD_SQL, (hashed, email))
+        conn.execute(database.INSERT_HISTORY_SQL, (email, hashed, now))
     reset_login_attempts(email)
 
 def verify_security_answer(email, answer):
-    cursor.execute("SELECT security_answer FROM users WHERE email = ?", (email,))
-    stored_answer = cursor.fetchone()
-    return stored_answer and stored_answer[0] == hash_password(answer.strip())
+    with db.connection() as conn:
+        stored_answer = conn.execute(database.SECURITY_ANSWER_SQL, (email,)).fetchone()
+    if not stored_answer:
+        return False
+    matches, needs_rehash = passwords.verify_password(answer.strip(), stored_answer[0])
+    if matches and needs_rehash:
+        _rehash(email, "security_answer", stored_answer[0], answer.strip())
+    return matches
 
 # ================= ADMIN USER MANAGEMENT =================
-def get_all_users():
-    cursor.execute("SELECT id, username, email, created_at, is_blocked FROM users ORDER BY id DESC")
-    return cursor.fetchall()
+def _use_fts(search_query):
+    # trigram index needs at least 3 characters; shorter searches fall back to LIKE
+    return len(search_query.strip()) >= FTS_MIN_QUERY
+
+def get_users_page(search_query="", cursor=None, page_size=25):
+    # keyset pagination: each page starts after the cursor of the last row shown
+    with db.connection() as conn:
+        if _use_fts(search_query):
+            # first page: every rank is above -inf
+            rank, last_id = cursor if cursor else (float("-inf"), -1)
+            rows = conn.execute(database.USER_SEARCH_SQL, (
+                database.fts_phrase(search_query.strip()), rank, rank, last_id, page_size + 1
+            )).fetchall()
+            next_cursor = (rows[page_size - 1][5], rows[page_size - 1][0]) if len(rows) > page_size else None
+        else:
+            where, params = database.user_filter(search_query, cursor)
+            rows = conn.execute(database.USER_PAGE_SQL.format(where=where), params + (page_size + 1,)).fetchall()
+            next_cursor = rows[page_size - 1][0] if len(rows) > page_size else None
+    return [row[:5] for row in rows[:page_size]], next_cursor
+
+def count_users(search_query=""):
+    with db.connection() as conn:
+        if _use_fts(search_query):
+            return conn.execute(database.USER_FTS_COUNT_SQL, (database.fts_phrase(search_query.strip()),)).fetchone()[0]
+        where, params = database.user_filter(search_query)
+        return conn.execute(database.USER_COUNT_SQL.format(where=where), params).fetchone()[0]
+
+def matching_user_emails(search_query=""):
+    with db.connection() as conn:
+        if _use_fts(search_query):
+            rows = conn.execute(database.USER_FTS_EMAILS_SQL, (database.fts_phrase(search_query.strip()),))
+        else:
+            where, params = database.user_filter(search_query)
+            rows = conn.execute(database.USER_EMAILS_SQL.format(where=where), params)
+        return [row[0] for row in rows]
+
+# bulk actions run every statement in one transaction: all users change or none do
+def set_users_blocked(emails, blocked):
+    params = [(int(blocked), email) for email in emails]
+    with db.connection(write=True) as conn:
+        conn.executemany(database.SET_BLOCKED_SQL, params)
+    return len(params)
+
+def delete_users(emails):
+    params = [(email,) for email in emails]
+    with db.connection(write=True) as conn:
+        for table in database.USER_TABLES:
+            conn.executemany(database.DELETE_BY_EMAIL_SQL.format(table=table), params)
+    for email in emails:
+        rate_limiter.reset(email)
+    return len(params)
 
 def block_user(email):
-    cursor.execute("UPDATE users SET is_blocked = 1 WHERE email = ?", (email,))
-    conn.commit()
+    set_users_blocked([email], True)
 
 def unblock_user(email):
-    cursor.execute("UPDATE users SET is_blocked = 0 WHERE email = ?", (email,))
-    conn.commit()
+    set_users_blocked([email], False)
 
 def delete_user(email):
-    cursor.execute("DELETE FROM users WHERE email = ?", (email,))
-    cursor.execute("DELETE FROM password_history WHERE email = ?", (email,))
-    cursor.execute("DELETE FROM login_attempts WHERE email = ?", (email,))
-    cursor.execute("DELETE FROM otp_requests WHERE email = ?", (email,))
-    conn.commit()
+    delete_users([email])
 
 def get_user_stats():
-    cursor.execute("SELECT COUNT(*) FROM users")
-    total = cursor.fetchone()[0]
-    cursor.execute("SELECT COUNT(*) FROM users WHERE is_blocked = 1")
-    blocked = cursor.fetchone()[0]
+    # counters are kept current by triggers on users (migration 5)
+    with db.connection() as conn:
+        total, blocked = conn.execute(database.USER_STATS_SQL).fetchone()
     return total, blocked, total - blocked
 
 # ================= OTP FUNCTIONS =================
@@ -265,46 +294,63 @@ def generate_otp():
 
 def save_otp(email, otp):
     expires_at = time.time() + (OTP_EXPIRY_MINUTES * 60)
-    cursor.execute("INSERT OR REPLACE INTO otp_requests (email, otp, expires_at) VALUES (?, ?, ?)",
-                   (email, otp, expires_at))
-    conn.commit()
+    with db.connection(write=True) as conn:
+        conn.execute(database.SAVE_OTP_SQL, (email, otp, expires_at))
+
+def set_otp_delivery(email, otp, status, error=None):
+    with db.connection(write=True) as conn:
+        conn.execute(database.SET_OTP_DELIVERY_SQL, (status, error, email, otp))
+
+def get_otp_delivery(email):
+    with db.connection() as conn:
+        data = conn.execute(database.OTP_DELIVERY_SQL, (email,)).fetchone()
+    return data if data else (None, None)
 
 def verify_otp(email, otp):
-    cursor.execute("SELECT otp, expires_at FROM otp_requests WHERE email = ?", (email,))
-    data = cursor.fetchone()
-    if data and data[0] == otp and time.time() < data[1]:
-        cursor.execute("DELETE FROM otp_requests WHERE email = ?", (email,))
-        conn.commit()
-        return True
+    with db.connection(write=True) as conn:
+        data = conn.execute(database.OTP_LOOKUP_SQL, (email,)).fetchone()
+        if data and data[0] == otp and time.time() < data[1]:
+            conn.execute(database.DELETE_BY_EMAIL_SQL.format(table="otp_requests"), (email,))
+            return True
     return False
 
+# One SMTP session per process, reused by a background worker
+@st.cache_resource
+def get_mail_queue():
+    return mailer.MailQueue(EMAIL_ADDRESS, EMAIL_PASSWORD)
+
+# Serialized once; each OTP mail only fills in the recipient, code and expiry
+@st.cache_resource
+def get_otp_template():
+    return mailer.MessageTemplate(f"PolicyNav <{EMAIL_ADDRESS}>", "🔐 PolicyNav - Password Reset OTP",
+                                  Templates.otp_email(mailer.slot("otp"), mailer.slot("minutes")))
+
+def _otp_message(to_email, otp):
+    data = get_otp_template().render(to_email, otp=otp, minutes=OTP_EXPIRY_MINUTES)
+    return (EMAIL_ADDRESS, to_email, data), lambda status, error: set_otp_delivery(to_email, otp, status, error)
+
 def send_otp_email(to_email, otp):
     try:
-        msg            = MIMEMultipart()
-        msg['From']    = f"PolicyNav <{EMAIL_ADDRESS}>"
-        msg['To']      = to_email
-        msg['Subject'] = "🔐 PolicyNav - Password Reset OTP"
-        body = f"""
-        <html>
-        <body style="font-family: Arial, sans-serif; background-color: #0E1117; color: #ffffff; padding: 20px;">
-            <div style="max-width: 400px; margin: 0 auto; background: #1e2530; border: 1px solid #2e3642; border-radius: 10px; padding: 30px;">
-                <h2 style="color: #4F8BF9; text-align: center;">PolicyNav</h2>
-                <p style="text-align: center;">Your OTP for password reset is:</p>
-                <h1 style="color: #4F8BF9; text-align: center; font-size: 36px; letter-spacing: 5px;">{otp}</h1>
-                <p style="text-align: center; color: #8b9bb4;">Valid for {OTP_EXPIRY_MINUTES} minutes</p>
-            </div>
-        </body>
-        </html>"""
-        msg.attach(MIMEText(body, 'html'))
-        server = smtplib.SMTP('smtp.gmail.com', 587)
-        server.starttls()
-        server.login(EMAIL_ADDRESS, EMAIL_PASSWORD)
-        server.send_message(msg)
-        server.quit()
-        return True, "OTP sent successfully!"
+        msg, on_status = _otp_message(to_email, otp)
+        if not get_mail_queue().send(msg, on_status):
+            set_otp_delivery(to_email, otp, "failed", "mail queue is full")
+            return False, "Mail queue is full, try again shortly"
+        return True, "OTP queued for delivery"
     except Exception as e:
         return False, str(e)
 
+def send_otp_emails(otps):
+    # bulk sends (e.g. a password-expiry campaign) share the worker's one SMTP connection
+    get_mail_queue().send_many(_otp_message(to_email, otp) for to_email, otp in otps)
+
+# ================= READABILITY LEVELS =================
+LEVEL_STYLES = {
+    "Beginner":     ("Elementary School",       "🟢", "#10b981", "rgba(16,185,129,0.1)", "Very easy to read. Suitable for general public communication."),
+    "Intermediate": ("Middle School",           "🔵", "#4F8BF9", "rgba(79,139,249,0.1)", "Easy to read. Clear language for a broad audience."),
+    "Advanced":     ("High School / College",   "🟡", "#f59e0b", "rgba(245,158,11,0.1)", "Moderately complex. Requires good reading skills."),
+    "Expert":       ("Professional / Academic", "🔴", "#ef4444", "rgba(239,68,68,0.1)",  "Very complex. Best suited for technical or academic readers."),
+}
+
 # ================= TOOLTIP HELPER =================
 def tooltip(icon_label, title, description):
     return f"""
@@ -342,6 +388,62 @@ for _k, _v in _session_defaults.items():
     if _k not in st.session_state:
         st.session_state[_k] = _v
 
+# ================= FLASH MESSAGES =================
+# Queued for the next render, so an action can st.rerun() straight away
+# instead of sleeping to keep its message on screen.
+FLASH_STYLES = {"success": st.success, "info": st.info, "warning": st.warning, "error": st.error}
+
+def flash(message, kind="success"):
+    st.session_state.setdefault("flash_messages", []).append((kind, message))
+
+def show_flash_messages():
+    for kind, message in st.session_state.pop("flash_messages", []):
+        FLASH_STYLES[kind](message)
+
+def logout(message=None):
+    st.session_state.token       = None
+    st.session_state.page        = "login"
+    st.session_state.username    = None
+    st.session_state.role        = "user"
+    st.session_state.menu_option = "Dashboard"
+    st.session_state.pop("auth_claims", None)
+    if message:
+        flash(message, "info")
+
+def authenticate_session():
+    # Runs on every rerun. The token is HMAC-verified once and its claims cached;
+    # later reruns only compare the clock against exp, and the signature is
+    # checked again when the token changes or is within TOKEN_RECHECK_SECONDS of expiring.
+    token = st.session_state.token
+    if not token:
+        return None
+    cached = st.session_state.get("auth_claims")
+    now    = time.time()
+    if cached and cached[0] == token and now < cached[1]["exp"] - TOKEN_RECHECK_SECONDS:
+        return cached[1]
+    claims = verify_token(token)
+    if claims is None:
+        logout("Your session has expired. Please sign in again.")
+        return None
+    st.session_state["auth_claims"] = (token, claims)
+    return claims
+
+def require_session():
+    # Fragment reruns skip the module-level check below, so every fragment
+    # calls this first; an expired token reruns the whole page to the login screen.
+    if authenticate_session() is None:
+        st.rerun()
+
+# ================= FRAGMENT CALLBACKS =================
+# A click inside a fragment already reruns it, so its buttons only update state
+# in on_click. st.rerun(scope="fragment") would raise when the same code runs
+# as part of a full-page rerun.
+def _set_state(key, value):
+    st.session_state[key] = value
+
+def _pop_state(key):
+    st.session_state.pop(key, None)
+
 # ================= PROFESSIONAL USER DASHBOARD =================
 def dashboard_page(username):
     now_dt = datetime.datetime.now()
@@ -384,6 +486,13 @@ def readability_page():
     </div>
     """, unsafe_allow_html=True)
 
+    readability_input()
+    readability_results()
+
+# Typing, uploading and tab switches rerun only the input area
+@st.fragment
+def readability_input():
+    require_session()
     tab1, tab2 = st.tabs(["✍️  Paste Text", "📂  Upload File"])
     text_input = ""
 
@@ -397,18 +506,26 @@ def readability_page():
         if raw_text:
             text_input = raw_text
         st.markdown(f"<p style='color:#2a3547; font-size:0.75rem; margin-top:0.3rem;'>{len(raw_text.split()) if raw_text else 0} words · {len(raw_text) if raw_text else 0} characters</p>", unsafe_allow_html=True)
+        if st.toggle("Live scores", key="readability_live_mode", help="Update the scores as the text changes"):
+            live_scores(raw_text)
 
     with tab2:
         uploaded_file = st.file_uploader("Upload a .txt or .pdf file", type=["txt", "pdf"], key="readability_file")
         if uploaded_file:
             try:
                 if uploaded_file.type == "application/pdf":
-                    reader = PyPDF2.PdfReader(uploaded_file)
-                    text   = ""
-                    for page in reader.pages:
-                        text += page.extract_text() + "\n"
-                    text_input = text
-                    st.success(f"✅ Loaded {len(reader.pages)} page(s) from PDF")
+                    cached = st.session_state.get("readability_pdf")
+                    if not cached or cached[0] != uploaded_file.file_id:
+                        progress_bar = st.progress(0.0, text="Extracting pages...")
+                        def _on_page(done, total):
+                            if done == total or done % max(1, total // 100) == 0:
+                                progress_bar.progress(done / total, text=f"Extracting page {done} of {total}")
+                        text, page_count = pdf_extract.extract_pdf_text(uploaded_file.getvalue(), progress=_on_page, pool=get_worker_pool())
+                        progress_bar.empty()
+                        cached = (uploaded_file.file_id, text, page_count)
+                        st.session_state["readability_pdf"] = cached
+                    _, text_input, page_count = cached
+                    st.success(f"✅ Loaded {page_count} page(s) from PDF")
                 else:
                     text_input = uploaded_file.read().decode("utf-8")
                     st.success(f"✅ Loaded: {uploaded_file.name}")
@@ -421,181 +538,266 @@ def readability_page():
         if len(text_input.strip()) < 50:
             st.error("Text is too short. Please enter at least 50 characters.")
         else:
-            with st.spinner("Analyzing readability..."):
-                analyzer = readability.ReadabilityAnalyzer(text_input)
-                scores   = analyzer.get_all_metrics()
-
-            flesch_ease  = scores["Flesch Reading Ease"]
-            fk_grade     = scores["Flesch-Kincaid Grade"]
-            smog         = scores["SMOG Index"]
-            gunning      = scores["Gunning Fog"]
-            coleman      = scores["Coleman-Liau"]
-
-            avg_grade = (fk_grade + gunning + smog + coleman) / 4
-
-            if avg_grade <= 6:
-                level      = "Beginner"
-                sublevel   = "Elementary School"
-                level_icon = "🟢"
-                lv_color   = "#10b981"
-                lv_bg      = "rgba(16,185,129,0.1)"
-                lv_desc    = "Very easy to read. Suitable for general public communication."
-            elif avg_grade <= 10:
-                level      = "Intermediate"
-                sublevel   = "Middle School"
-                level_icon = "🔵"
-                lv_color   = "#4F8BF9"
-                lv_bg      = "rgba(79,139,249,0.1)"
-                lv_desc    = "Easy to read. Clear language for a broad audience."
-            elif avg_grade <= 14:
-                level      = "Advanced"
-                sublevel   = "High School / College"
-                level_icon = "🟡"
-                lv_color   = "#f59e0b"
-                lv_bg      = "rgba(245,158,11,0.1)"
-                lv_desc    = "Moderately complex. Requires good reading skills."
-            else:
-                level      = "Expert"
-                sublevel   = "Professional / Academic"
-                level_icon = "🔴"
-                lv_color   = "#ef4444"
-                lv_bg      = "rgba(239,68,68,0.1)"
-                lv_desc    = "Very complex. Best suited for technical or academic readers."
+            # results live in their own fragment; rerun the page once so it picks them up
+            st.session_state["readability_analysis"] = text_input
+            st.rerun()
 
-            st.markdown(f"""
-            <div class="level-banner" style="border-color: {lv_color}33;">
-                <div class="level-icon" style="background: {lv_bg}; font-size:1.8rem;">{level_icon}</div>
-                <div>
-                    <p class="level-title">{level} Level</p>
-                    <p class="level-desc">{sublevel} · {lv_desc}</p>
-                </div>
-                <div class="level-grade">
-                    <p class="level-grade-num" style="color:{lv_color};">{avg_grade:.1f}</p>
-                    <p class="level-grade-label">Grade Level</p>
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
+# The text area reports a new value when it loses focus or on Ctrl+Enter, which
+# debounces typing; each change re-counts only the sentences around the edit.
+def live_scores(text):
+    counter = st.session_state.setdefault("readability_live", readability.IncrementalCounter())
+    counts  = counter.update(text or "")
+    if not counts.words:
+        return
+    scores = readability.metrics_from_counts(counts)
+    level  = readability.grade_level(readability.average_grade(scores))
+    pills  = "".join(f"""
+        <div class="stat-pill">
+            <span class="stat-pill-value">{value:.1f}</span>
+            <span class="stat-pill-label">{name}</span>
+        </div>""" for name, value in scores.items())
+    st.markdown(f"""
+    <div class="stat-row">{pills}
+        <div class="stat-pill">
+            <span class="stat-pill-value" style="color:{LEVEL_STYLES[level][2]};">{level}</span>
+            <span class="stat-pill-label">Level</span>
+        </div>
+    </div>""", unsafe_allow_html=True)
 
-            st.markdown("""
-            <div class="section-header" style="margin-top:0.5rem;">
-                <h2>Readability Scores</h2>
-                <span>Hover the <b>?</b> icon on each metric to learn what it means</span>
-            </div>""", unsafe_allow_html=True)
+@st.fragment
+def readability_results():
+    require_session()
+    text_input = st.session_state.get("readability_analysis")
+    if not text_input:
+        return
+    cached = st.session_state.get("readability_result")
+    if cached and cached[0] == text_input:
+        analyzer = cached[1]
+    else:
+        with st.spinner("Analyzing readability..."):
+            analyzer, breakdown = get_readability_cache().analyze_with_breakdown(text_input, pool=get_worker_pool())
+        st.session_state["readability_result"] = (text_input, analyzer)
+        if breakdown is not None:
+            # the sentence view slices the normalized text the offsets refer to
+            st.session_state["sentence_breakdown"] = (analyzer.text, breakdown)
+            st.session_state["heatmap_page"]       = 0
+    scores = analyzer.get_all_metrics()
+
+    flesch_ease  = scores["Flesch Reading Ease"]
+    fk_grade     = scores["Flesch-Kincaid Grade"]
+    smog         = scores["SMOG Index"]
+    gunning      = scores["Gunning Fog"]
+    coleman      = scores["Coleman-Liau"]
+
+    avg_grade = readability.average_grade(scores)
+    level     = readability.grade_level(avg_grade)
+    sublevel, level_icon, lv_color, lv_bg, lv_desc = LEVEL_STYLES[level]
+
+    st.markdown(f"""
+    <div class="level-banner" style="border-color: {lv_color}33;">
+        <div class="level-icon" style="background: {lv_bg}; font-size:1.8rem;">{level_icon}</div>
+        <div>
+            <p class="level-title">{level} Level</p>
+            <p class="level-desc">{sublevel} · {lv_desc}</p>
+        </div>
+        <div class="level-grade">
+            <p class="level-grade-num" style="color:{lv_color};">{avg_grade:.1f}</p>
+            <p class="level-grade-label">Grade Level</p>
+        </div>
+    </div>
+    """, unsafe_allow_html=True)
 
-            col1, col2, col3 = st.columns(3)
-
-            flesch_interp = (
-                "Very Easy" if flesch_ease >= 90 else
-                "Easy" if flesch_ease >= 70 else
-                "Fairly Easy" if flesch_ease >= 60 else
-                "Standard" if flesch_ease >= 50 else
-                "Fairly Difficult" if flesch_ease >= 30 else
-                "Difficult"
-            )
-            with col1:
-                st.markdown(metric_card(
-                    "Flesch Reading Ease",
-                    "Flesch Reading Ease",
-                    "Scores text from 0–100. Higher = easier to read. A score of 60–70 is ideal for general audiences. Very low scores mean the text is academic or legal in nature.",
-                    flesch_ease,
-                    flesch_ease,
-                    "#4F8BF9",
-                    f"Interpretation: {flesch_interp}",
-                    "📘"
-                ), unsafe_allow_html=True)
-
-            with col2:
-                fk_interp = f"~Grade {fk_grade:.0f} reading level"
-                st.markdown(metric_card(
-                    "Flesch-Kincaid Grade",
-                    "Flesch-Kincaid Grade Level",
-                    "Converts readability to a US school grade number. Grade 8 = readable by most adults. Grade 12+ = college-level. The higher the number, the harder the text.",
-                    fk_grade,
-                    (fk_grade / 20) * 100,
-                    "#7c3aed",
-                    fk_interp,
-                    "🎓"
-                ), unsafe_allow_html=True)
-
-            with col3:
-                smog_interp = f"Requires approximately {smog:.0f} years of education"
-                st.markdown(metric_card(
-                    "SMOG Index",
-                    "SMOG Index (Simple Measure of Gobbledygook)",
-                    "Estimates how many years of education someone needs to understand your text. Focuses on counting complex words (3+ syllables). A score of 8 is ideal for public-facing content.",
-                    smog,
-                    (smog / 20) * 100,
-                    "#10b981",
-                    smog_interp,
-                    "🔬"
-                ), unsafe_allow_html=True)
-
-            col4, col5 = st.columns(2)
-
-            with col4:
-                fog_interp = (
-                    "Accessible — easy for most readers" if gunning < 8 else
-                    "Standard — comfortable reading level" if gunning < 12 else
-                    "Academic — requires focused reading" if gunning < 16 else
-                    "Very dense — specialist audience"
-                )
-                st.markdown(metric_card(
-                    "Gunning Fog Index",
-                    "Gunning Fog Index",
-                    "Measures how many years of formal education a reader needs. It looks at sentence length and the percentage of complex words. Below 12 is ideal for wide readership.",
-                    gunning,
-                    (gunning / 20) * 100,
-                    "#f59e0b",
-                    fog_interp,
-                    "🌫️"
-                ), unsafe_allow_html=True)
-
-            with col5:
-                cl_interp = f"~Grade {coleman:.0f} level — based on characters per word"
-                st.markdown(metric_card(
-                    "Coleman-Liau Index",
-                    "Coleman-Liau Index",
-                    "Unlike other formulas, this uses characters (not syllables) to estimate grade level. It counts average letters per 100 words and sentences per 100 words. More accurate for digital text.",
-                    coleman,
-                    (coleman / 20) * 100,
-                    "#ef4444",
-                    cl_interp,
-                    "🔢"
-                ), unsafe_allow_html=True)
+    st.markdown("""
+    <div class="section-header" style="margin-top:0.5rem;">
+        <h2>Readability Scores</h2>
+        <span>Hover the <b>?</b> icon on each metric to learn what it means</span>
+    </div>""", unsafe_allow_html=True)
 
-            st.markdown("""
-            <div class="section-header" style="margin-top:1.5rem;">
-                <h2>Text Statistics</h2>
-            </div>""", unsafe_allow_html=True)
+    col1, col2, col3 = st.columns(3)
+
+    flesch_interp = (
+        "Very Easy" if flesch_ease >= 90 else
+        "Easy" if flesch_ease >= 70 else
+        "Fairly Easy" if flesch_ease >= 60 else
+        "Standard" if flesch_ease >= 50 else
+        "Fairly Difficult" if flesch_ease >= 30 else
+        "Difficult"
+    )
+    with col1:
+        st.markdown(metric_card(
+            "Flesch Reading Ease",
+            "Flesch Reading Ease",
+            "Scores text from 0–100. Higher = easier to read. A score of 60–70 is ideal for general audiences. Very low scores mean the text is academic or legal in nature.",
+            flesch_ease,
+            flesch_ease,
+            "#4F8BF9",
+            f"Interpretation: {flesch_interp}",
+            "📘"
+        ), unsafe_allow_html=True)
+
+    with col2:
+        fk_interp = f"~Grade {fk_grade:.0f} reading level"
+        st.markdown(metric_card(
+            "Flesch-Kincaid Grade",
+            "Flesch-Kincaid Grade Level",
+            "Converts readability to a US school grade number. Grade 8 = readable by most adults. Grade 12+ = college-level. The higher the number, the harder the text.",
+            fk_grade,
+            (fk_grade / 20) * 100,
+            "#7c3aed",
+            fk_interp,
+            "🎓"
+        ), unsafe_allow_html=True)
+
+    with col3:
+        smog_interp = f"Requires approximately {smog:.0f} years of education"
+        st.markdown(metric_card(
+            "SMOG Index",
+            "SMOG Index (Simple Measure of Gobbledygook)",
+            "Estimates how many years of education someone needs to understand your text. Focuses on counting complex words (3+ syllables). A score of 8 is ideal for public-facing content.",
+            smog,
+            (smog / 20) * 100,
+            "#10b981",
+            smog_interp,
+            "🔬"
+        ), unsafe_allow_html=True)
+
+    col4, col5 = st.columns(2)
+
+    with col4:
+        fog_interp = (
+            "Accessible — easy for most readers" if gunning < 8 else
+            "Standard — comfortable reading level" if gunning < 12 else
+            "Academic — requires focused reading" if gunning < 16 else
+            "Very dense — specialist audience"
+        )
+        st.markdown(metric_card(
+            "Gunning Fog Index",
+            "Gunning Fog Index",
+            "Measures how many years of formal education a reader needs. It looks at sentence length and the percentage of complex words. Below 12 is ideal for wide readership.",
+            gunning,
+            (gunning / 20) * 100,
+            "#f59e0b",
+            fog_interp,
+            "🌫️"
+        ), unsafe_allow_html=True)
+
+    with col5:
+        cl_interp = f"~Grade {coleman:.0f} level — based on characters per word"
+        st.markdown(metric_card(
+            "Coleman-Liau Index",
+            "Coleman-Liau Index",
+            "Unlike other formulas, this uses characters (not syllables) to estimate grade level. It counts average letters per 100 words and sentences per 100 words. More accurate for digital text.",
+            coleman,
+            (coleman / 20) * 100,
+            "#ef4444",
+            cl_interp,
+            "🔢"
+        ), unsafe_allow_html=True)
+
+    st.markdown("""
+    <div class="section-header" style="margin-top:1.5rem;">
+        <h2>Text Statistics</h2>
+    </div>""", unsafe_allow_html=True)
+
+    st.markdown(f"""
+    <div class="stat-row">
+        <div class="stat-pill">
+            <span class="stat-pill-value">{analyzer.num_sentences}</span>
+            <span class="stat-pill-label">Sentences</span>
+        </div>
+        <div class="stat-pill">
+            <span class="stat-pill-value">{analyzer.num_words}</span>
+            <span class="stat-pill-label">Words</span>
+        </div>
+        <div class="stat-pill">
+            <span class="stat-pill-value">{analyzer.num_syllables}</span>
+            <span class="stat-pill-label">Syllables</span>
+        </div>
+        <div class="stat-pill">
+            <span class="stat-pill-value">{analyzer.complex_words}</span>
+            <span class="stat-pill-label">Complex Words</span>
+        </div>
+        <div class="stat-pill">
+            <span class="stat-pill-value">{analyzer.char_count}</span>
+            <span class="stat-pill-label">Characters</span>
+        </div>
+        <div class="stat-pill">
+            <span class="stat-pill-value">{round(analyzer.num_words / max(analyzer.num_sentences, 1), 1)}</span>
+            <span class="stat-pill-label">Avg Words/Sent</span>
+        </div>
+    </div>
+    """, unsafe_allow_html=True)
+
+    sentence_difficulty(analyzer.text)
 
+# ================= SENTENCE DIFFICULTY =================
+def sentence_difficulty(text):
+    st.markdown("""
+    <div class="section-header" style="margin-top:1.5rem;">
+        <h2>Sentence Difficulty</h2>
+        <span>Which sentences push the grade level up</span>
+    </div>""", unsafe_allow_html=True)
+    view = st.radio("View", ["Off", "Hardest sentences", "Heatmap"], horizontal=True,
+                    key="sentence_view", label_visibility="collapsed")
+    if view == "Off":
+        return
+
+    cached = st.session_state.get("sentence_breakdown")
+    if not cached or cached[0] != text:
+        with st.spinner("Scoring sentences..."):
+            _, breakdown = readability.sentence_breakdown(text)
+        cached = (text, breakdown)
+        st.session_state["sentence_breakdown"] = cached
+        st.session_state["heatmap_page"]       = 0
+    breakdown = cached[1]
+    starts, ends = breakdown["start"], breakdown["end"]
+    if not len(starts):
+        st.info("No sentences found."); return
+    # sentences can span blank lines, which would end the HTML block early
+    sentence = lambda i: html.escape(" ".join(text[starts[i]:ends[i]].split()))
+
+    if view == "Hardest sentences":
+        count = st.slider("Show", 5, 50, 10, key="hardest_count")
+        for rank, i in enumerate(readability.hardest_sentences(breakdown, count), 1):
+            color = LEVEL_STYLES[breakdown["level"][i]][2]
             st.markdown(f"""
-            <div class="stat-row">
-                <div class="stat-pill">
-                    <span class="stat-pill-value">{analyzer.num_sentences}</span>
-                    <span class="stat-pill-label">Sentences</span>
-                </div>
-                <div class="stat-pill">
-                    <span class="stat-pill-value">{analyzer.num_words}</span>
-                    <span class="stat-pill-label">Words</span>
-                </div>
-                <div class="stat-pill">
-                    <span class="stat-pill-value">{analyzer.num_syllables}</span>
-                    <span class="stat-pill-label">Syllables</span>
-                </div>
-                <div class="stat-pill">
-                    <span class="stat-pill-value">{analyzer.complex_words}</span>
-                    <span class="stat-pill-label">Complex Words</span>
-                </div>
-                <div class="stat-pill">
-                    <span class="stat-pill-value">{analyzer.char_count}</span>
-                    <span class="stat-pill-label">Characters</span>
-                </div>
-                <div class="stat-pill">
-                    <span class="stat-pill-value">{round(analyzer.num_words / max(analyzer.num_sentences, 1), 1)}</span>
-                    <span class="stat-pill-label">Avg Words/Sent</span>
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
+            <div style="display:flex; gap:1rem; padding:10px 14px; background:#0d1117; border:1px solid #1e2736;
+                 border-left:3px solid {color}; border-radius:6px; margin-bottom:6px;">
+                <span style="color:{color}; font-family:'DM Mono',monospace; font-size:0.82rem; flex:0 0 5.5rem;">
+                    #{rank} · FK {breakdown["fk_grade"][i]:.1f}
+                </span>
+                <span style="color:#e2e8f0; font-size:0.85rem; flex:1;">{sentence(i)}</span>
+                <span style="color:#4a5a72; font-size:0.75rem; flex:0 0 8rem; text-align:right;">
+                    {breakdown["words"][i]} words · {breakdown["polysyllable_ratio"][i]:.0%} polysyllabic
+                </span>
+            </div>""", unsafe_allow_html=True)
+        return
+
+    pages = max(1, -(-len(starts) // HEATMAP_PAGE_SIZE))
+    page  = min(st.session_state.get("heatmap_page", 0), pages - 1)
+    lo, hi = page * HEATMAP_PAGE_SIZE, min(len(starts), (page + 1) * HEATMAP_PAGE_SIZE)
+    spans = "".join(
+        f'<span title="FK {breakdown["fk_grade"][i]:.1f} · {breakdown["words"][i]} words" '
+        f'style="background:{LEVEL_STYLES[breakdown["level"][i]][3]}; border-radius:3px; padding:1px 2px;">'
+        f'{sentence(i)}</span> '
+        for i in range(lo, hi)
+    )
+    legend = " ".join(f'<span style="background:{bg}; color:{color}; border-radius:3px; padding:1px 6px;">{name}</span>'
+                      for name, (_, _, color, bg, _) in LEVEL_STYLES.items())
+    st.markdown(f"""
+    <div style="font-size:0.75rem; margin-bottom:0.5rem;">{legend}</div>
+    <div style="color:#e2e8f0; font-size:0.88rem; line-height:1.9; background:#0d1117; border:1px solid #1e2736;
+         border-radius:8px; padding:14px 16px;">{spans}</div>""", unsafe_allow_html=True)
+
+    prev_col, page_col, next_col = st.columns([1, 3, 1])
+    with prev_col:
+        st.button("← Previous", key="heatmap_prev", use_container_width=True, disabled=page == 0,
+                  on_click=_set_state, args=("heatmap_page", page - 1))
+    with page_col:
+        st.markdown(f"<p style='color:#4a5a72; font-size:0.8rem; text-align:center; margin-top:0.5rem;'>Sentences {lo + 1}–{hi} of {len(starts)} · page {page + 1} of {pages}</p>", unsafe_allow_html=True)
+    with next_col:
+        st.button("Next →", key="heatmap_next", use_container_width=True, disabled=page >= pages - 1,
+                  on_click=_set_state, args=("heatmap_page", page + 1))
 
 # ================= ADMIN DASHBOARD PAGE =================
 def admin_dashboard_page():
@@ -617,19 +819,88 @@ def admin_dashboard_page():
         st.markdown('<div class="stat-card"><p class="stat-number" style="color:#f59e0b;">∞</p><p class="stat-label">Admin Access</p></div>', unsafe_allow_html=True)
 
     st.markdown("<br>", unsafe_allow_html=True)
-
-    search_query = st.text_input("🔍 Search users by name or email", placeholder="Search...", key="admin_search")
-
-    users = get_all_users()
-    if search_query:
-        users = [u for u in users if search_query.lower() in u[1].lower() or search_query.lower() in u[2].lower()]
-
-    st.markdown(f"<p style='color:#4a5a72; font-size:0.8rem; margin-bottom:0.5rem;'>Showing {len(users)} user(s)</p>", unsafe_allow_html=True)
+    admin_user_table()
+
+# Checkbox callbacks run before the rerun, so the bulk bar above the rows
+# already sees the new selection
+def _toggle_selected(email, key):
+    selected = st.session_state.setdefault("admin_selected", set())
+    if st.session_state[key]:
+        selected.add(email)
+    else:
+        selected.discard(email)
+
+def _clear_selection():
+    st.session_state["admin_selected"] = set()
+    for key in [key for key in st.session_state if key.startswith("select_")]:
+        del st.session_state[key]
+
+# Searching, paging and selecting rerun only this table; actions that change
+# the stat cards above rerun the whole page.
+@st.fragment
+def admin_user_table():
+    require_session()
+    search_col, size_col = st.columns([4, 1])
+    with search_col:
+        search_query = st.text_input("🔍 Search users by name or email", placeholder="Search...", key="admin_search")
+    with size_col:
+        page_size = st.selectbox("Per page", ADMIN_PAGE_SIZES, key="admin_page_size")
+
+    # one cursor per visited page; a new search or page size starts over
+    if st.session_state.get("admin_page_query") != (search_query, page_size):
+        st.session_state["admin_page_query"]   = (search_query, page_size)
+        st.session_state["admin_page_cursors"] = [None]
+        _clear_selection()
+    cursors  = st.session_state["admin_page_cursors"]
+    selected = st.session_state["admin_selected"]
+    page    = len(cursors) - 1
+
+    matching           = count_users(search_query)
+    users, next_cursor = get_users_page(search_query, cursors[-1], page_size)
+
+    first = page * page_size + 1 if users else 0
+    st.markdown(f"<p style='color:#4a5a72; font-size:0.8rem; margin-bottom:0.5rem;'>Showing {first}–{page * page_size + len(users)} of {matching} user(s)</p>", unsafe_allow_html=True)
 
     if not users:
         st.markdown('<div style="text-align:center;padding:3rem;color:#4a5a72;"><h3>No users found</h3></div>', unsafe_allow_html=True)
         return
 
+    scope_col, block_col, unblock_col, delete_col = st.columns([2, 1, 1, 1])
+    with scope_col:
+        # fixed options: changing labels would make it a new widget and reset the choice
+        scope = st.radio("Bulk action on", ["Selected", "All matching"], horizontal=True, key="admin_bulk_scope")
+        st.caption(f"{len(selected)} selected · {matching} matching")
+    bulk_all = scope == "All matching"
+    with block_col:
+        bulk_block = st.button("🚫 Block", key="bulk_block", use_container_width=True, disabled=not (bulk_all or selected))
+    with unblock_col:
+        bulk_unblock = st.button("✅ Unblock", key="bulk_unblock", use_container_width=True, disabled=not (bulk_all or selected))
+    with delete_col:
+        st.button("🗑️ Delete", key="bulk_delete", use_container_width=True, disabled=not (bulk_all or selected),
+                  on_click=_set_state, args=("confirm_bulk_delete", True))
+
+    if bulk_block or bulk_unblock:
+        targets = matching_user_emails(search_query) if bulk_all else list(selected)
+        changed = set_users_blocked(targets, bulk_block)
+        _clear_selection()
+        flash(f"{'Blocked' if bulk_block else 'Unblocked'} {changed} user(s)"); st.rerun()
+
+    if st.session_state.get("confirm_bulk_delete"):
+        count = matching if bulk_all else len(selected)
+        st.markdown(f"""
+        <div style="background:rgba(239,68,68,0.08); border:1px solid #ef444433; border-radius:8px;
+             padding:12px 16px; margin:4px 0 8px 0; color:#fca5a5; font-size:0.85rem;">
+            ⚠️ Delete <strong>{count}</strong> user(s)? This cannot be undone.
+        </div>""", unsafe_allow_html=True)
+        yes_col, no_col, _ = st.columns([1, 1, 4])
+        with yes_col:
+            if st.button("Yes, Delete", key="yes_bulk_del", type="primary"):
+                deleted = delete_users(matching_user_emails(search_query) if bulk_all else list(selected))
+                _clear_selection(); st.session_state.pop("confirm_bulk_delete", None)
+                flash(f"Deleted {deleted} user(s)"); st.rerun()
+        with no_col:
+            st.button("Cancel", key="no_bulk_del", on_click=_pop_state, args=("confirm_bulk_delete",))
+
     st.markdown("""
     <div style="display:flex; padding:10px 16px; background:#080b12; border-radius:8px 8px 0 0; border:1px solid #1e2736; gap:1rem; margin-top:0.5rem;">
         <span style="color:#4a5a72; font-size:0.72rem; font-weight:600; text-transform:uppercase; letter-spacing:0.06em; flex:0.3;">#</span>
@@ -656,19 +927,21 @@ def admin_dashboard_page():
             <span style="flex:1.2;"></span>
         </div>""", unsafe_allow_html=True)
 
-        col_block, col_delete, col_spacer = st.columns([1, 1, 3])
+        col_select, col_block, col_delete, col_spacer = st.columns([0.4, 1, 1, 2.6])
+        with col_select:
+            st.checkbox("Select", value=uemail in selected, key=f"select_{uid}", label_visibility="collapsed",
+                        on_change=_toggle_selected, args=(uemail, f"select_{uid}"))
         with col_block:
             if ublocked:
                 if st.button(f"✅ Unblock", key=f"unblock_{uid}", use_container_width=True):
-                    unblock_user(uemail); st.success(f"Unblocked {uname}"); time.sleep(0.8); st.rerun()
+                    unblock_user(uemail); flash(f"Unblocked {uname}"); st.rerun()
             else:
                 if st.button(f"🚫 Block", key=f"block_{uid}", use_container_width=True):
-                    block_user(uemail); st.warning(f"Blocked {uname}"); time.sleep(0.8); st.rerun()
+                    block_user(uemail); flash(f"Blocked {uname}", "warning"); st.rerun()
         with col_delete:
-            if st.button(f"🗑️ Delete", key=f"delete_{uid}", use_container_width=True):
-                if "confirm_delete" not in st.session_state:
-                    st.session_state["confirm_delete"] = uemail
-                    st.rerun()
+            # one confirmation at a time
+            st.button(f"🗑️ Delete", key=f"delete_{uid}", use_container_width=True,
+                      on_click=st.session_state.setdefault, args=("confirm_delete", uemail))
 
         if st.session_state.get("confirm_delete") == uemail:
             st.markdown(f"""
@@ -680,16 +953,25 @@ def admin_dashboard_page():
             with yes_col:
                 if st.button("Yes, Delete", key=f"yes_del_{uid}", type="primary"):
                     delete_user(uemail); st.session_state.pop("confirm_delete", None)
-                    st.success(f"Deleted {uname}"); time.sleep(0.8); st.rerun()
+                    flash(f"Deleted {uname}"); st.rerun()
             with no_col:
-                if st.button("Cancel", key=f"no_del_{uid}"):
-                    st.session_state.pop("confirm_delete", None); st.rerun()
+                st.button("Cancel", key=f"no_del_{uid}", on_click=_pop_state, args=("confirm_delete",))
 
         st.markdown("<div style='height:4px'></div>", unsafe_allow_html=True)
 
+    prev_col, page_col, next_col = st.columns([1, 3, 1])
+    with prev_col:
+        st.button("← Previous", key="admin_prev_page", use_container_width=True, disabled=page == 0,
+                  on_click=cursors.pop)
+    with page_col:
+        st.markdown(f"<p style='color:#4a5a72; font-size:0.8rem; text-align:center; margin-top:0.5rem;'>Page {page + 1} of {max(1, -(-matching // page_size))}</p>", unsafe_allow_html=True)
+    with next_col:
+        st.button("Next →", key="admin_next_page", use_container_width=True, disabled=next_cursor is None,
+                  on_click=cursors.append, args=(next_cursor,))
+
 # ================= PAGE FUNCTIONS =================
 def signup():
-    st.markdown(Templates.logo(), unsafe_allow_html=True)
+    st.markdown(Templates.LOGO, unsafe_allow_html=True)
     st.markdown('<h1 class="page-title" style="text-align: center;">Create Account</h1>', unsafe_allow_html=True)
 
     _, center_col, _ = st.columns([1, 2, 1])
@@ -721,10 +1003,9 @@ def signup():
             if not is_valid_ans: st.error(ans_msg); return
             if check_user_exists(email): st.error("Email already exists"); return
             if register_user(username, email, password, security_question, security_answer):
-                st.success("Account created successfully!")
+                flash("Account created successfully!")
                 for key in ['signup_username','signup_email','signup_password','signup_confirm','signup_answer']:
                     if key in st.session_state: del st.session_state[key]
-                time.sleep(1.5)
                 st.session_state.page = "login"; st.rerun()
             else:
                 st.error("Registration failed")
@@ -734,7 +1015,7 @@ def signup():
             st.session_state.page = "login"; st.rerun()
 
 def login():
-    st.markdown(Templates.logo(), unsafe_allow_html=True)
+    st.markdown(Templates.LOGO, unsafe_allow_html=True)
     st.markdown('<h1 class="page-title" style="text-align: center;">Welcome back</h1>', unsafe_allow_html=True)
     st.markdown('<p class="page-subtitle" style="text-align: center;">Sign in to your account</p>', unsafe_allow_html=True)
 
@@ -761,15 +1042,13 @@ def login():
                     st.session_state.role        = "user"
                     st.session_state.page        = "dashboard"
                     st.session_state.menu_option = "Dashboard"
-                    st.success("Login successful!")
-                    time.sleep(1); st.rerun()
+                    flash("Login successful!"); st.rerun()
                 elif username == "locked":
                     st.error("Account is locked. Please try again later.")
                 elif username == "blocked":
                     st.error("Your account has been blocked. Please contact admin.")
                 else:
-                    attempts, _ = get_login_attempts(email)
-                    attempts_left = MAX_LOGIN_ATTEMPTS - attempts
+                    attempts_left = MAX_LOGIN_ATTEMPTS - get_login_attempts(email)
                     st.error(f"Invalid credentials. {attempts_left} attempts left")
 
         st.markdown("<br>", unsafe_allow_html=True)
@@ -786,17 +1065,7 @@ def login():
                 st.session_state.page = "admin_login"; st.rerun()
 
 def admin_login():
-    st.markdown("""
-    <div class="logo-container">
-        <div class="logo-icon" style="border-color: #f59e0b; box-shadow: 0 0 20px rgba(245,158,11,0.2);">
-            <svg viewBox="0 0 24 24" fill="none" stroke="#f59e0b" stroke-width="2" style="width:2rem;height:2rem;">
-                <path d="M12 22s8-4 8-10V5l-8-3-8 3v7c0 6 8 10 8 10z"/>
-                <path d="M9 12l2 2 4-4"/>
-            </svg>
-        </div>
-        <div class="logo-text">PolicyNav</div>
-        <div class="logo-subtext" style="color: #f59e0b;">Admin Portal</div>
-    </div>""", unsafe_allow_html=True)
+    st.markdown(Templates.ADMIN_LOGO, unsafe_allow_html=True)
 
     st.markdown('<h1 class="page-title" style="color:#f59e0b; text-align:center;">Admin Access</h1>', unsafe_allow_html=True)
     
@@ -821,8 +1090,7 @@ def admin_login():
                 st.session_state.role        = "admin"
                 st.session_state.page        = "dashboard"
                 st.session_state.menu_option = "Dashboard"
-                st.success("Welcome, Admin!")
-                time.sleep(1); st.rerun()
+                flash("Welcome, Admin!"); st.rerun()
             else:
                 st.error("Invalid admin credentials")
 
@@ -831,7 +1099,7 @@ def admin_login():
             st.session_state.page = "login"; st.rerun()
 
 def forgot_password():
-    st.markdown(Templates.logo(), unsafe_allow_html=True)
+    st.markdown(Templates.LOGO, unsafe_allow_html=True)
     st.markdown('<h1 class="page-title" style="text-align: center;">Reset Password</h1>', unsafe_allow_html=True)
 
     _, center_col, _ = st.columns([1, 2, 1])
@@ -860,8 +1128,7 @@ def forgot_password():
                     if success:
                         st.session_state.reset_email  = email
                         st.session_state.reset_method = "otp"
-                        st.success("OTP sent to your email!")
-                        time.sleep(1); st.rerun()
+                        st.rerun()
                     else:
                         st.error(f"Failed to send OTP: {msg}")
                 else:
@@ -870,23 +1137,32 @@ def forgot_password():
                     st.rerun()
 
         elif st.session_state.reset_method == "otp" and not st.session_state.otp_verified:
-            st.markdown(f"""
-            <div style="background:rgba(79,139,249,0.08); border:1px solid #4F8BF933; border-radius:8px;
-                 padding:10px 14px; margin-bottom:1rem; text-align:center;">
-                <span style="color:#4F8BF9; font-size:0.88rem;">
-                    📧 OTP sent to <strong>{st.session_state.reset_email}</strong>
-                </span>
-            </div>""", unsafe_allow_html=True)
+            status, error = get_otp_delivery(st.session_state.reset_email)
+            if status == "failed":
+                st.error(f"Failed to send OTP: {error}")
+            else:
+                sending = "Sending OTP to" if status == "queued" else "OTP sent to"
+                st.markdown(f"""
+                <div style="background:rgba(79,139,249,0.08); border:1px solid #4F8BF933; border-radius:8px;
+                     padding:10px 14px; margin-bottom:1rem; text-align:center;">
+                    <span style="color:#4F8BF9; font-size:0.88rem;">
+                        📧 {sending} <strong>{st.session_state.reset_email}</strong>
+                    </span>
+                </div>""", unsafe_allow_html=True)
             otp_input = st.text_input("Enter OTP", placeholder="6-digit code", key="otp_input", max_chars=6)
             if st.button("Verify OTP", key="verify_otp", type="primary", use_container_width=True):
                 if verify_otp(st.session_state.reset_email, otp_input):
                     st.session_state.otp_verified = True
-                    st.success("OTP verified!"); st.rerun()
+                    flash("OTP verified!"); st.rerun()
                 else:
                     st.error("Invalid or expired OTP")
             if st.button("Resend OTP", key="resend_otp", use_container_width=True):
                 otp = generate_otp(); save_otp(st.session_state.reset_email, otp)
-                send_otp_email(st.session_state.reset_email, otp); st.success("New OTP sent!")
+                success, msg = send_otp_email(st.session_state.reset_email, otp)
+                if success:
+                    st.success("New OTP on its way!")
+                else:
+                    st.error(f"Failed to send OTP: {msg}")
 
         elif st.session_state.reset_method == "security" and not st.session_state.otp_verified:
             user_details = get_user_details(st.session_state.reset_email)
@@ -904,7 +1180,7 @@ def forgot_password():
                         st.error("Please enter your answer")
                     elif verify_security_answer(st.session_state.reset_email, answer):
                         st.session_state.otp_verified = True
-                        st.success("Answer verified!"); time.sleep(0.8); st.rerun()
+                        flash("Answer verified!"); st.rerun()
                     else:
                         st.error("Incorrect security answer")
 
@@ -938,10 +1214,9 @@ def _new_password_form():
         is_valid_pass, pass_msg = valid_password(new_password)
         if not is_valid_pass: st.error(pass_msg); return
         if check_password_reused(st.session_state.reset_email, new_password):
-            st.error("Cannot reuse any of your last 5 passwords"); return
+            st.error(f"Cannot reuse any of your last {PASSWORD_HISTORY_DEPTH} passwords"); return
         update_password(st.session_state.reset_email, new_password)
-        st.success("Password updated successfully!")
-        time.sleep(1.5)
+        flash("Password updated successfully!")
         st.session_state.page         = "login"
         st.session_state.reset_email  = None
         st.session_state.otp_verified = False
@@ -950,45 +1225,39 @@ def _new_password_form():
         st.rerun()
 
 # ================= MAIN ROUTING WITH SIDEBAR =================
-if st.session_state.token:
-    is_admin = st.session_state.role == "admin"
-    username = st.session_state.username
+# Every sidebar button navigates, so it isn't a fragment; the callbacks run
+# before the rerun the click triggers instead of calling st.rerun() for a second one.
+def select_menu(option):
+    st.session_state.menu_option = option
+
+claims = authenticate_session()
+show_flash_messages()
+if claims:
+    is_admin = claims["role"] == "admin"
+    username = claims["username"]
 
     with st.sidebar:
-        st.markdown("""
-            <div style="display:flex; align-items:center; gap:10px; margin-bottom:1rem; padding: 0 10px;">
-                <div style="width:28px;height:28px;border-radius:6px;background:linear-gradient(135deg, #4F8BF9, #3672e0);display:flex;align-items:center;justify-content:center;">
-                    <svg viewBox="0 0 24 24" fill="none" stroke="white" stroke-width="2" style="width:16px;height:16px;"><path d="M12 22s8-4 8-10V5l-8-3-8 3v7c0 6 8 10 8 10z"/></svg>
-                </div>
-                <span style="color:#fff;font-weight:600;font-size:1.1rem;letter-spacing:-0.02em;">PolicyNav</span>
-            </div>
-        """, unsafe_allow_html=True)
+        st.markdown(Templates.SIDEBAR_BRAND, unsafe_allow_html=True)
         
         if is_admin:
             st.markdown('<div style="padding-left:10px; margin-bottom:1rem;"><span class="admin-badge">ADMIN</span></div>', unsafe_allow_html=True)
             
             st.markdown('<div class="menu-label">Menu</div>', unsafe_allow_html=True)
-            if st.button("📊 Dashboard", use_container_width=True, type="primary" if st.session_state.menu_option == "Dashboard" else "secondary"):
-                st.session_state.menu_option = "Dashboard"; st.rerun()
-            if st.button("👥 Users", use_container_width=True, type="primary" if st.session_state.menu_option == "Users" else "secondary"):
-                st.session_state.menu_option = "Users"; st.rerun()
+            st.button("📊 Dashboard", use_container_width=True, type="primary" if st.session_state.menu_option == "Dashboard" else "secondary",
+                      on_click=select_menu, args=("Dashboard",))
+            st.button("👥 Users", use_container_width=True, type="primary" if st.session_state.menu_option == "Users" else "secondary",
+                      on_click=select_menu, args=("Users",))
         else:
             st.markdown('<div class="menu-label">Tools</div>', unsafe_allow_html=True)
-            if st.button("📊 Dashboard", use_container_width=True, type="primary" if st.session_state.menu_option == "Dashboard" else "secondary"):
-                st.session_state.menu_option = "Dashboard"; st.rerun()
-            if st.button("📖 Readability Analyzer", use_container_width=True, type="primary" if st.session_state.menu_option == "Readability" else "secondary"):
-                st.session_state.menu_option = "Readability"; st.rerun()
+            st.button("📊 Dashboard", use_container_width=True, type="primary" if st.session_state.menu_option == "Dashboard" else "secondary",
+                      on_click=select_menu, args=("Dashboard",))
+            st.button("📖 Readability Analyzer", use_container_width=True, type="primary" if st.session_state.menu_option == "Readability" else "secondary",
+                      on_click=select_menu, args=("Readability",))
 
         # This transparent spacer will push the elements below it down toward the bottom of the sidebar
         st.markdown('<div class="sidebar-spacer"></div>', unsafe_allow_html=True)
 
-        if st.button("🚪 Log out", key="logout_btn", use_container_width=True):
-            st.session_state.token        = None
-            st.session_state.page         = "login"
-            st.session_state.username     = None
-            st.session_state.role         = "user"
-            st.session_state.menu_option  = "Dashboard"
-            st.rerun()
+        st.button("🚪 Log out", key="logout_btn", use_container_width=True, on_click=logout)
 
         # Simple Profile Text - NO LOGO, NO PLAN 
         st.markdown(f"""
@@ -1015,6 +1284,36 @@ if st.session_state.token:
                 st.markdown(f'<div class="stat-card"><p class="stat-number" style="color:#10b981">{active}</p><p class="stat-label">Active Users</p></div>', unsafe_allow_html=True)
             with c3:
                 st.markdown(f'<div class="stat-card"><p class="stat-number" style="color:#ef4444">{blocked}</p><p class="stat-label">Blocked Users</p></div>', unsafe_allow_html=True)
+            cache_stats = get_readability_cache().stats()
+            word_stats  = readability.word_cache_stats()
+            st.markdown(f"""
+            <div class="stat-row">
+                <div class="stat-pill">
+                    <span class="stat-pill-value">{cache_stats['entries']}/{cache_stats['max_entries']}</span>
+                    <span class="stat-pill-label">Cached Analyses</span>
+                </div>
+                <div class="stat-pill">
+                    <span class="stat-pill-value">{cache_stats['hits']}</span>
+                    <span class="stat-pill-label">Cache Hits</span>
+                </div>
+                <div class="stat-pill">
+                    <span class="stat-pill-value">{cache_stats['misses']}</span>
+                    <span class="stat-pill-label">Cache Misses</span>
+                </div>
+                <div class="stat-pill">
+                    <span class="stat-pill-value">{cache_stats['evictions']}</span>
+                    <span class="stat-pill-label">Evictions</span>
+                </div>
+                <div class="stat-pill">
+                    <span class="stat-pill-value">{cache_stats['hit_rate']:.0%}</span>
+                    <span class="stat-pill-label">Hit Rate</span>
+                </div>
+                <div class="stat-pill">
+                    <span class="stat-pill-value">{word_stats['hit_rate']:.0%}</span>
+                    <span class="stat-pill-label">Word Cache Hit Rate</span>
+                </div>
+            </div>
+            """, unsafe_allow_html=True)
             st.markdown("<br>", unsafe_allow_html=True)
             st.info("Navigate to **👥 Users** to manage user accounts.")
         elif st.session_state.menu_option == "Users":
@@ -0,0 +1,93 @@
+%%writefile assets.py
+import hashlib
+import os
+import re
+import urllib.request
+from styles import CSS
+
+# ================= CONFIG =================
+# Streamlit serves ./static at app/static when server.enableStaticServing is on
+# (see .streamlit/config.toml). It only sends a real Content-Type for images,
+# fonts, pdf, xml and json; a .css file would go out as text/plain with nosniff
+# and browsers would refuse it. So the stylesheet stays inline and only the
+# font files are served from there.
+STATIC_DIR    = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+STATIC_URL    = "app/static"
+FONTS_DIR     = os.path.join(STATIC_DIR, "fonts")
+FONTS_CSS_URL = "https://fonts.googleapis.com/css2?family=DM+Sans:wght@300;400;500;600;700&family=DM+Mono:wght@400;500&display=swap"
+# Google Fonts picks the font format from the user agent; this one gets woff2
+FONTS_AGENT   = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+
+_IMPORT_RE = re.compile(r"@import\s+url\([^)]*\);?")
+
+
+# ================= MINIFY =================
+def minify_css(css):
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{}:;,>])\s*", r"\1", css)
+    return css.replace(";}", "}").strip()
+
+# ================= FONTS =================
+# python assets.py --fetch-fonts downloads DM Sans / DM Mono once, so pages
+# never reach out to Google Fonts. Without them the @import is kept.
+def fetch_fonts():
+    os.makedirs(FONTS_DIR, exist_ok=True)
+    request = urllib.request.Request(FONTS_CSS_URL, headers={"User-Agent": FONTS_AGENT})
+    with urllib.request.urlopen(request, timeout=30) as response:
+        css = response.read().decode()
+
+    def _download(match):
+        url  = match.group(1)
+        name = hashlib.sha256(url.encode()).hexdigest()[:16] + os.path.splitext(url)[1]
+        path = os.path.join(FONTS_DIR, name)
+        if not os.path.exists(path):
+            urllib.request.urlretrieve(url, path)
+        return f"url({STATIC_URL}/fonts/{name})"
+
+    css = re.sub(r"url\((https://[^)]+)\)", _download, css)
+    with open(os.path.join(FONTS_DIR, "fonts.css"), "w", encoding="utf-8") as f:
+        f.write(css)
+    return css
+
+def _local_fonts():
+    path = os.path.join(FONTS_DIR, "fonts.css")
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+# ================= STYLESHEET =================
+def _css_body():
+    return CSS.strip().removeprefix("<style>").removesuffix("</style>")
+
+def build_stylesheet():
+    # returns the <style> tag injected on every rerun; built once per process
+    css   = minify_css(_css_body())
+    fonts = _local_fonts()
+    if fonts:
+        # @font-face rules pointing at app/static/fonts replace the Google Fonts @import
+        css = minify_css(fonts) + _IMPORT_RE.sub("", css)
+    return f"<style>{css}</style>"
+
+
+# ================= MEASUREMENT =================
+def payload_report():
+    from templates import Templates
+    rows = [
+        ("CSS as before (raw <style>)", len(CSS.encode())),
+        ("CSS minified inline", len(build_stylesheet().encode())),
+        ("logo template", len(Templates.LOGO.encode())),
+        ("sidebar brand template", len(Templates.SIDEBAR_BRAND.encode())),
+    ]
+    for label, size in rows:
+        print(f"{label:<30} {size:8d} bytes/rerun")
+
+if __name__ == "__main__":
+    import sys
+    if "--fetch-fonts" in sys.argv:
+        fetch_fonts()
+        print(f"fonts saved to {FONTS_DIR}")
+    payload_report()
+print("assets.py created successfully!")
@@ -0,0 +1,318 @@
+%%writefile database.py
+import contextlib
+import datetime
+import os
+import queue
+import sqlite3
+import threading
+
+DB_PATH         = "users.db"
+POOL_SIZE       = int(os.environ.get('DB_POOL_SIZE', 8))
+BUSY_TIMEOUT_MS = int(os.environ.get('DB_BUSY_TIMEOUT_MS', 5000))
+
+# ================= MIGRATIONS =================
+# Each step is SQL or a callable taking the connection. Append new versions;
+# never edit one that has already shipped.
+def _add_is_blocked(conn):
+    # databases created before blocking existed lack the column
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(users)")]
+    if "is_blocked" not in columns:
+        conn.execute("ALTER TABLE users ADD COLUMN is_blocked INTEGER DEFAULT 0")
+
+MIGRATIONS = [
+    (1, [
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL,
+            email TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL,
+            security_question TEXT NOT NULL,
+            security_answer TEXT NOT NULL,
+            created_at TEXT,
+            is_blocked INTEGER DEFAULT 0
+        )""",
+        """
+        CREATE TABLE IF NOT EXISTS password_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            email TEXT NOT NULL,
+            password TEXT NOT NULL,
+            set_at TEXT,
+            FOREIGN KEY(email) REFERENCES users(email)
+        )""",
+        """
+        CREATE TABLE IF NOT EXISTS login_attempts (
+            email TEXT PRIMARY KEY,
+            attempts INTEGER DEFAULT 0,
+            last_attempt REAL
+        )""",
+        """
+        CREATE TABLE IF NOT EXISTS otp_requests (
+            email TEXT PRIMARY KEY,
+            otp TEXT,
+            expires_at REAL
+        )""",
+    ]),
+    (2, [_add_is_blocked]),
+    (3, [
+        # check_password_reused / delete_user look history up by email, newest first
+        "CREATE INDEX IF NOT EXISTS idx_password_history_email_id ON password_history(email, id)",
+        # get_user_stats counts blocked users
+        "CREATE INDEX IF NOT EXISTS idx_users_is_blocked ON users(is_blocked)",
+    ]),
+    (4, [
+        # admin search: trigram FTS over username/email, kept in sync by triggers (SQLite 3.34+)
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5(
+            username, email, content='users', content_rowid='id', tokenize='trigram'
+        )""",
+        """
+        CREATE TRIGGER IF NOT EXISTS users_fts_insert AFTER INSERT ON users BEGIN
+            INSERT INTO users_fts (rowid, username, email) VALUES (new.id, new.username, new.email);
+        END""",
+        """
+        CREATE TRIGGER IF NOT EXISTS users_fts_delete AFTER DELETE ON users BEGIN
+            INSERT INTO users_fts (users_fts, rowid, username, email) VALUES ('delete', old.id, old.username, old.email);
+        END""",
+        """
+        CREATE TRIGGER IF NOT EXISTS users_fts_update AFTER UPDATE OF username, email ON users BEGIN
+            INSERT INTO users_fts (users_fts, rowid, username, email) VALUES ('delete', old.id, old.username, old.email);
+            INSERT INTO users_fts (rowid, username, email) VALUES (new.id, new.username, new.email);
+        END""",
+        "INSERT INTO users_fts (users_fts) VALUES ('rebuild')",
+    ]),
+    (5, [
+        # single-row counters for the dashboard cards, maintained by triggers instead of COUNT(*) scans
+        """
+        CREATE TABLE IF NOT EXISTS user_stats (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            total INTEGER NOT NULL,
+            blocked INTEGER NOT NULL
+        )""",
+        """
+        INSERT OR REPLACE INTO user_stats (id, total, blocked)
+        SELECT 1, COUNT(*), COUNT(*) FILTER (WHERE is_blocked IS 1) FROM users""",
+        """
+        CREATE TRIGGER IF NOT EXISTS user_stats_insert AFTER INSERT ON users BEGIN
+            UPDATE user_stats SET total = total + 1, blocked = blocked + (new.is_blocked IS 1) WHERE id = 1;
+        END""",
+        """
+        CREATE TRIGGER IF NOT EXISTS user_stats_delete AFTER DELETE ON users BEGIN
+            UPDATE user_stats SET total = total - 1, blocked = blocked - (old.is_blocked IS 1) WHERE id = 1;
+        END""",
+        """
+        CREATE TRIGGER IF NOT EXISTS user_stats_block AFTER UPDATE OF is_blocked ON users BEGIN
+            UPDATE user_stats SET blocked = blocked + (new.is_blocked IS 1) - (old.is_blocked IS 1) WHERE id = 1;
+        END""",
+    ]),
+    (6, [
+        # OTP mail is sent by a background worker; the reset page polls its outcome
+        "ALTER TABLE otp_requests ADD COLUMN delivery_status TEXT",
+        "ALTER TABLE otp_requests ADD COLUMN delivery_error TEXT",
+    ]),
+    (7, [
+        # blocked totals come from user_stats now; nothing filters on is_blocked,
+        # so the index only added a write to every block/unblock
+        "DROP INDEX IF EXISTS idx_users_is_blocked",
+    ]),
+]
+
+
+def migrate(conn):
+    conn.execute("CREATE TABLE IF NOT EXISTS schema_migrations (version INTEGER PRIMARY KEY, applied_at TEXT)")
+    conn.commit()
+    applied = {row[0] for row in conn.execute("SELECT version FROM schema_migrations")}
+    for version, steps in MIGRATIONS:
+        if version in applied:
+            continue
+        conn.execute("BEGIN")
+        try:
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+            conn.execute("INSERT INTO schema_migrations (version, applied_at) VALUES (?, ?)",
+                         (version, datetime.datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+
+# ================= QUERIES =================
+# Every statement app.py and rate_limit.py run against users.db. They live
+# here so check_query_plans explains exactly the SQL the app executes.
+AUTH_USER_SQL        = "SELECT username, password, is_blocked FROM users WHERE email = ?"
+INSERT_USER_SQL      = "INSERT INTO users (username, email, password, security_question, security_answer, created_at) VALUES (?, ?, ?, ?, ?, ?)"
+INSERT_HISTORY_SQL   = "INSERT INTO password_history (email, password, set_at) VALUES (?, ?, ?)"
+SET_PASSWORD_SQL     = "UPDATE users SET password = ? WHERE email = ?"
+# swaps a stored hash for a current one, only if it has not changed meanwhile
+REHASH_SQL           = "UPDATE users SET {column} = ? WHERE email = ? AND {column} = ?"
+REHASH_COLUMNS       = ("password", "security_answer")
+USER_EXISTS_SQL      = "SELECT 1 FROM users WHERE email = ?"
+USER_DETAILS_SQL     = "SELECT username, security_question, security_answer FROM users WHERE email = ?"
+SECURITY_ANSWER_SQL  = "SELECT security_answer FROM users WHERE email = ?"
+PASSWORD_HISTORY_SQL = "SELECT password FROM password_history WHERE email = ? ORDER BY id DESC LIMIT ?"
+SET_BLOCKED_SQL      = "UPDATE users SET is_blocked = ? WHERE email = ?"
+USER_STATS_SQL       = "SELECT total, blocked FROM user_stats WHERE id = 1"
+OTP_LOOKUP_SQL       = "SELECT otp, expires_at FROM otp_requests WHERE email = ?"
+OTP_DELIVERY_SQL     = "SELECT delivery_status, delivery_error FROM otp_requests WHERE email = ?"
+SAVE_OTP_SQL         = "INSERT OR REPLACE INTO otp_requests (email, otp, expires_at, delivery_status) VALUES (?, ?, ?, 'queued')"
+# a resend replaces the row, so only the matching OTP's status is updated
+SET_OTP_DELIVERY_SQL = "UPDATE otp_requests SET delivery_status = ?, delivery_error = ? WHERE email = ? AND otp = ?"
+# every table holding a user's rows, cleared together when the user is deleted
+USER_TABLES          = ("users", "password_history", "login_attempts", "otp_requests")
+DELETE_BY_EMAIL_SQL  = "DELETE FROM {table} WHERE email = ?"
+
+# Rate limiter write-behind; windows are reloaded once at startup
+EXPIRE_ATTEMPTS_SQL = "DELETE FROM login_attempts WHERE last_attempt < ?"
+LOAD_ATTEMPTS_SQL   = "SELECT email, attempts, last_attempt FROM login_attempts"
+SAVE_ATTEMPTS_SQL   = """
+INSERT INTO login_attempts (email, attempts, last_attempt) VALUES (?, ?, ?)
+ON CONFLICT(email) DO UPDATE SET attempts = excluded.attempts, last_attempt = excluded.last_attempt"""
+
+# Admin list without FTS (no search, or one shorter than a trigram); {where} comes from user_filter
+USER_PAGE_SQL   = "SELECT id, username, email, created_at, is_blocked FROM users WHERE 1 = 1{where} ORDER BY id DESC LIMIT ?"
+USER_COUNT_SQL  = "SELECT COUNT(*) FROM users WHERE 1 = 1{where}"
+USER_EMAILS_SQL = "SELECT email FROM users WHERE 1 = 1{where}"
+
+def user_filter(search_query="", cursor=None):
+    where, params = "", ()
+    if search_query:
+        escaped = search_query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        pattern = f"%{escaped}%"
+        where  += " AND (username LIKE ? ESCAPE '\\' OR email LIKE ? ESCAPE '\\')"
+        params += (pattern, pattern)
+    if cursor is not None:
+        where  += " AND id < ?"
+        params += (cursor,)
+    return where, params
+
+# ================= USER SEARCH =================
+# Best bm25 rank first; (rank, id) is the keyset cursor between pages
+USER_SEARCH_SQL = """
+WITH hits AS (SELECT rowid AS id, rank FROM users_fts WHERE users_fts MATCH ?)
+SELECT u.id, u.username, u.email, u.created_at, u.is_blocked, hits.rank
+FROM hits JOIN users u ON u.id = hits.id
+WHERE hits.rank > ? OR (hits.rank = ? AND u.id < ?)
+ORDER BY hits.rank, u.id DESC
+LIMIT ?"""
+USER_FTS_COUNT_SQL  = "SELECT COUNT(*) FROM users_fts WHERE users_fts MATCH ?"
+USER_FTS_EMAILS_SQL = "SELECT u.email FROM users_fts JOIN users u ON u.id = users_fts.rowid WHERE users_fts MATCH ?"
+
+def fts_phrase(text):
+    return '"' + text.replace('"', '""') + '"'
+
+
+# ================= QUERY PLANS =================
+# check_query_plans fails on any full table scan or temp-table sort, unless
+# the query is listed with the reason it may scan.
+def _filtered(sql, search_query="", cursor=None, *extra):
+    where, params = user_filter(search_query, cursor)
+    return sql.format(where=where), params + extra
+
+_LIKE_SCAN    = "only for 1-2 character searches, below the trigram size"
+_STARTUP_SCAN = "once at startup, over windows younger than the lockout"
+
+HOT_QUERIES = [
+    ("authenticate user",    AUTH_USER_SQL, ("a@b.c",), None),
+    ("register user",        INSERT_USER_SQL, ("a", "a@b.c", "x", "q", "x", "2024-01-01"), None),
+    ("add password history", INSERT_HISTORY_SQL, ("a@b.c", "x", "2024-01-01"), None),
+    ("set password",         SET_PASSWORD_SQL, ("x", "a@b.c"), None),
+    ("user exists",          USER_EXISTS_SQL, ("a@b.c",), None),
+    ("user details",         USER_DETAILS_SQL, ("a@b.c",), None),
+    ("security answer",      SECURITY_ANSWER_SQL, ("a@b.c",), None),
+    ("password history",     PASSWORD_HISTORY_SQL, ("a@b.c", 5), None),
+    ("block user",           SET_BLOCKED_SQL, (1, "a@b.c"), None),
+    ("user stats",           USER_STATS_SQL, (), None),
+    ("user page",            *_filtered(USER_PAGE_SQL, "", 100, 25), None),
+    ("user page search",     *_filtered(USER_PAGE_SQL, "a", 100, 25), _LIKE_SCAN),
+    ("user search count",    *_filtered(USER_COUNT_SQL, "a"), _LIKE_SCAN),
+    ("user search emails",   *_filtered(USER_EMAILS_SQL, "a"), _LIKE_SCAN),
+    ("user fts search",      USER_SEARCH_SQL, ('"abc"', 0.0, 0.0, 100, 25), "ranking sorts the matching rows only"),
+    ("user fts count",       USER_FTS_COUNT_SQL, ('"abc"',), None),
+    ("user fts emails",      USER_FTS_EMAILS_SQL, ('"abc"',), None),
+    ("otp lookup",           OTP_LOOKUP_SQL, ("a@b.c",), None),
+    ("otp delivery",         OTP_DELIVERY_SQL, ("a@b.c",), None),
+    ("save otp",             SAVE_OTP_SQL, ("a@b.c", "123456", 0.0), None),
+    ("set otp delivery",     SET_OTP_DELIVERY_SQL, ("sent", None, "a@b.c", "123456"), None),
+    ("expire attempts",      EXPIRE_ATTEMPTS_SQL, (0.0,), _STARTUP_SCAN),
+    ("load attempts",        LOAD_ATTEMPTS_SQL, (), _STARTUP_SCAN),
+    ("save attempts",        SAVE_ATTEMPTS_SQL, ("a@b.c", 1, 0.0), None),
+] + [(f"rehash {column}", REHASH_SQL.format(column=column), ("x", "a@b.c", "x"), None) for column in REHASH_COLUMNS] \
+  + [(f"delete from {table}", DELETE_BY_EMAIL_SQL.format(table=table), ("a@b.c",), None) for table in USER_TABLES]
+
+def query_plan(conn, sql, params=()):
+    return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+def _is_full_scan(detail):
+    # "SCAN users" is a table scan; "SCAN users USING COVERING INDEX ..." still visits every entry.
+    # An FTS table driven by MATCH shows up as "SCAN ... VIRTUAL TABLE INDEX 0:M..."
+    if "VIRTUAL TABLE INDEX" in detail and ":M" in detail:
+        return False
+    return detail.startswith("SCAN ") or detail.startswith("USE TEMP B-TREE")
+
+def check_query_plans(conn):
+    problems = []
+    for name, sql, params, allowed_scan in HOT_QUERIES:
+        plan = query_plan(conn, sql, params)
+        if not allowed_scan and any(_is_full_scan(detail) for detail in plan):
+            problems.append((name, plan))
+    return problems
+
+
+def connect(path=DB_PATH):
+    conn = sqlite3.connect(path, check_same_thread=False, timeout=BUSY_TIMEOUT_MS / 1000)
+    # WAL lets readers run while a writer commits; NORMAL is durable enough under WAL
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    return conn
+
+
+# ================= CONNECTION POOL =================
+# A connection is only ever used by the thread that checked it out, so
+# check_same_thread is off but statements never interleave on one cursor.
+class ConnectionPool:
+    def __init__(self, path=DB_PATH, size=POOL_SIZE):
+        self.path   = path
+        self._idle  = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        conn = connect(path)
+        migrate(conn)
+        self._idle.put(conn)
+
+    @contextlib.contextmanager
+    def connection(self, write=False):
+        self._slots.acquire()
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = connect(self.path)
+            try:
+                if write:
+                    # take the write lock up front so busy_timeout applies instead of a deadlock error
+                    conn.execute("BEGIN IMMEDIATE")
+                yield conn
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            finally:
+                self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+if __name__ == "__main__":
+    import sys
+    conn = connect(sys.argv[1] if len(sys.argv) > 1 else ":memory:")
+    migrate(conn)
+    problems = check_query_plans(conn)
+    for name, plan in problems:
+        print(f"FULL SCAN in {name}: {' | '.join(plan)}")
+    if problems:
+        sys.exit(1)
+    print(f"{len(HOT_QUERIES)} hot queries checked, no unexpected full scans")
+print("database.py created successfully!")
@@ -0,0 +1,126 @@
+%%writefile loadtest.py
+import argparse
+import multiprocessing
+import os
+import queue
+import statistics
+import sys
+import tempfile
+import time
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+# ================= LOAD TEST =================
+# python loadtest.py [--sessions 8] [--seconds 20] [--hold 0.8]
+# Every simulated session signs in as admin, opens the user list and keeps
+# blocking / unblocking its own user, one script run per click. AppTest is not
+# thread-safe, so each session drives its own AppTest in its own spawned
+# process; all of them share one users.db. Reported: actions/sec across all
+# sessions and the latency of one click. Exits 1 if any session failed.
+# --hold sleeps before every st.rerun(), which is what each of these actions
+# did before the flash queue (0.8 s for block/unblock). Compare
+# `--hold 0.8` with the default `--hold 0` for the gain per server.
+APP_PATH        = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+PAGE_SIZE       = 25
+STARTUP_TIMEOUT = 120.0
+
+def _hold_reruns(seconds):
+    rerun = st.rerun
+    def held(*args, **kwargs):
+        time.sleep(seconds)
+        return rerun(*args, **kwargs)
+    st.rerun = held
+
+def _seed_users(count):
+    import database
+    pool = database.ConnectionPool("users.db")
+    with pool.connection(write=True) as conn:
+        conn.executemany(database.INSERT_USER_SQL, [
+            (f"load{i}", f"load{i}@example.com", "x", "x", "x", "2024-01-01") for i in range(count)
+        ])
+        return [row[0] for row in conn.execute("SELECT id FROM users ORDER BY id")]
+
+def _session(uid, seconds, hold, ready, results):
+    # runs in its own process; signs in first, then waits for the others so
+    # every session clicks during the same window
+    latencies, elapsed = [], 0.0
+    try:
+        if hold:
+            _hold_reruns(hold)
+        at = AppTest.from_file(APP_PATH, default_timeout=60)
+        at.session_state["page"] = "admin_login"
+        at.run()
+        at.text_input(key="admin_email").input(os.environ.get('ADMIN_EMAIL', 'admin@policynav.com'))
+        at.text_input(key="admin_pass").input(os.environ.get('ADMIN_PASSWORD', 'Admin@123'))
+        at.button(key="admin_login_btn").click().run()
+        at.session_state["menu_option"] = "Users"
+        at.run()
+        ready.wait()
+        start    = time.perf_counter()
+        deadline = start + seconds
+        blocked  = False
+        while time.perf_counter() < deadline:
+            key   = f"{'unblock' if blocked else 'block'}_{uid}"
+            click = time.perf_counter()
+            at.button(key=key).click().run()
+            if at.exception:
+                raise RuntimeError(at.exception[0].message)
+            latencies.append(time.perf_counter() - click)
+            blocked = not blocked
+        elapsed = time.perf_counter() - start
+        results.put((uid, latencies, elapsed, None))
+    except Exception as e:
+        ready.abort()
+        results.put((uid, latencies, elapsed, f"{type(e).__name__}: {e}"))
+
+def run(sessions, seconds, hold):
+    uids    = _seed_users(sessions)
+    ctx     = multiprocessing.get_context("spawn")
+    ready   = ctx.Barrier(sessions, timeout=STARTUP_TIMEOUT)
+    results = ctx.Queue()
+    procs   = [ctx.Process(target=_session, args=(uid, seconds, hold, ready, results)) for uid in uids]
+    for proc in procs:
+        proc.start()
+    latencies, elapsed, errors = [], 0.0, []
+    for _ in procs:
+        try:
+            uid, session_latencies, session_elapsed, error = results.get(timeout=STARTUP_TIMEOUT + seconds)
+        except queue.Empty:
+            errors.append("a session stopped without reporting")
+            break
+        latencies += session_latencies
+        elapsed    = max(elapsed, session_elapsed)
+        if error:
+            errors.append(f"session {uid}: {error}")
+    for proc in procs:
+        proc.join(STARTUP_TIMEOUT)
+        if proc.exitcode is None:
+            proc.terminate()
+            errors.append(f"{proc.name} did not exit")
+        elif proc.exitcode:
+            errors.append(f"{proc.name} exited with {proc.exitcode}")
+    for error in errors:
+        print(error, file=sys.stderr)
+    if errors or not latencies:
+        return False
+    latencies.sort()
+    print(f"{sessions} sessions, hold {hold:.1f}s before each rerun")
+    print(f"actions          : {len(latencies)} in {elapsed:.1f}s")
+    print(f"actions/sec      : {len(latencies) / elapsed:.1f}")
+    print(f"latency p50 / p95: {statistics.median(latencies) * 1000:.0f} / {latencies[int(len(latencies) * 0.95)] * 1000:.0f} ms")
+    return True
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure admin actions/sec with one AppTest session per process.")
+    parser.add_argument("--sessions", type=int, default=8, help="concurrent simulated users")
+    parser.add_argument("--seconds", type=float, default=20.0, help="time each session keeps clicking")
+    parser.add_argument("--hold", type=float, default=0.0, help="sleep before each st.rerun(), as the old post-action delay did")
+    args = parser.parse_args()
+    if not 1 <= args.sessions <= PAGE_SIZE:
+        parser.error(f"--sessions must be 1-{PAGE_SIZE}; each session's user has to be on the first admin page")
+    # a scratch working directory, so users.db and the caches start empty;
+    # spawned sessions inherit it
+    os.chdir(tempfile.mkdtemp(prefix="policynav-load-"))
+    if not run(args.sessions, args.seconds, args.hold):
+        sys.exit(1)
+print("loadtest.py created successfully!")
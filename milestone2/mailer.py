@@ -0,0 +1,219 @@
+%%writefile mailer.py
+import os
+import queue
+import re
+import smtplib
+import threading
+import time
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
+
+# ================= CONFIG =================
+SMTP_HOST         = os.environ.get('SMTP_HOST', 'smtp.gmail.com')
+SMTP_PORT         = int(os.environ.get('SMTP_PORT', 587))
+SMTP_STARTTLS     = os.environ.get('SMTP_STARTTLS', '1') == '1'
+SMTP_TIMEOUT      = float(os.environ.get('SMTP_TIMEOUT', 10))
+SMTP_IDLE_TIMEOUT = float(os.environ.get('SMTP_IDLE_TIMEOUT', 60))
+MAIL_QUEUE_SIZE   = int(os.environ.get('MAIL_QUEUE_SIZE', 1000))
+MAIL_MAX_ATTEMPTS = int(os.environ.get('MAIL_MAX_ATTEMPTS', 4))
+MAIL_BACKOFF      = float(os.environ.get('MAIL_BACKOFF', 1.0))
+MAIL_BACKOFF_MAX  = 30.0
+
+
+# ================= MESSAGE TEMPLATES =================
+# The MIME message is serialized once with @@name@@ slots; rendering a message
+# only joins the fixed byte runs with the slot values. Slot values must be
+# ASCII, and the body is kept 7bit so the slots survive serialization.
+_SLOT_RE = re.compile(rb"@@(\w+)@@")
+
+def slot(name):
+    return f"@@{name}@@"
+
+class MessageTemplate:
+    def __init__(self, sender, subject, html):
+        msg            = MIMEMultipart()
+        msg['From']    = sender
+        msg['To']      = slot("to")
+        msg['Subject'] = subject
+        msg.attach(MIMEText(html, 'html', 'us-ascii'))
+        parts       = _SLOT_RE.split(msg.as_bytes(policy=msg.policy.clone(linesep="\r\n")))
+        self.sender = sender
+        self._text  = parts[0::2]
+        self._slots = [name.decode() for name in parts[1::2]]
+
+    def render(self, to, **values):
+        values["to"] = to
+        out = [self._text[0]]
+        for name, text in zip(self._slots, self._text[1:]):
+            value = str(values[name])
+            if "\r" in value or "\n" in value:
+                raise ValueError(f"line break in mail slot {name!r}")
+            out.append(value.encode("ascii"))
+            out.append(text)
+        return b"".join(out)
+
+
+# ================= MAIL QUEUE =================
+# One worker thread owns one SMTP session and reuses it for every message,
+# reconnecting with exponential backoff when the server drops it. The session
+# is closed after SMTP_IDLE_TIMEOUT seconds without mail.
+# on_status(status, error) is called with "sent" or "failed" per message.
+# A message is an email.message.Message or a (from, to, bytes) tuple from
+# MessageTemplate.render.
+class MailQueue:
+    def __init__(self, sender, password, host=SMTP_HOST, port=SMTP_PORT, starttls=SMTP_STARTTLS,
+                 max_attempts=MAIL_MAX_ATTEMPTS, backoff=MAIL_BACKOFF, idle_timeout=SMTP_IDLE_TIMEOUT):
+        self.sender       = sender
+        self.password     = password
+        self.host         = host
+        self.port         = port
+        self.starttls     = starttls
+        self.max_attempts = max_attempts
+        self.backoff      = backoff
+        self.idle_timeout = idle_timeout
+        self.sent         = 0
+        self.failed       = 0
+        self.connects     = 0
+        self._queue  = queue.Queue(MAIL_QUEUE_SIZE)
+        self._server = None
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def send(self, msg, on_status=None, block=False):
+        try:
+            self._queue.put((msg, on_status), block=block)
+        except queue.Full:
+            return False
+        return True
+
+    def send_many(self, messages):
+        # blocks while the queue is full so a large batch can't be dropped
+        for msg, on_status in messages:
+            self.send(msg, on_status, block=True)
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def join(self):
+        self._queue.join()
+
+    # ================= SMTP SESSION =================
+    def _connect(self):
+        server = smtplib.SMTP(self.host, self.port, timeout=SMTP_TIMEOUT)
+        try:
+            if self.starttls:
+                server.starttls()
+            if self.password:
+                server.login(self.sender, self.password)
+        except Exception:
+            server.close()
+            raise
+        self.connects += 1
+        return server
+
+    def _disconnect(self):
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except Exception:
+            self._server.close()
+        self._server = None
+
+    def _deliver(self, msg):
+        delay = self.backoff
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                if self._server is None:
+                    self._server = self._connect()
+                if isinstance(msg, tuple):
+                    self._server.sendmail(*msg)
+                else:
+                    self._server.send_message(msg)
+                return None
+            except smtplib.SMTPRecipientsRefused as e:
+                # the address is bad; retrying won't help
+                return str(e)
+            except (smtplib.SMTPException, OSError) as e:
+                self._disconnect()
+                if attempt == self.max_attempts:
+                    return str(e)
+                time.sleep(delay)
+                delay = min(delay * 2, MAIL_BACKOFF_MAX)
+
+    def _run(self):
+        while True:
+            try:
+                msg, on_status = self._queue.get(timeout=self.idle_timeout)
+            except queue.Empty:
+                self._disconnect()
+                continue
+            try:
+                error = self._deliver(msg)
+                if error is None:
+                    self.sent += 1
+                else:
+                    self.failed += 1
+                if on_status:
+                    on_status("failed" if error else "sent", error)
+            except Exception:
+                pass
+            finally:
+                self._queue.task_done()
+
+
+# ================= BENCHMARK =================
+# python mailer.py --count 2000 [--host localhost --port 8025]
+# Without --host, a local aiosmtpd sink is started in-process.
+def _benchmark(host, port, count):
+    from templates import Templates
+    sender   = "PolicyNav <bench@localhost>"
+    subject  = "PolicyNav - Password Reset OTP"
+    template = MessageTemplate(sender, subject, Templates.otp_email(slot("otp"), slot("minutes")))
+    server   = smtplib.SMTP(host, port)
+
+    start = time.perf_counter()
+    for i in range(count):
+        # what send_otp_email used to do per message
+        msg            = MIMEMultipart()
+        msg['From']    = sender
+        msg['To']      = f"user{i}@localhost"
+        msg['Subject'] = subject
+        msg.attach(MIMEText(Templates.otp_email(f"{i:06d}", 10), 'html'))
+        server.send_message(msg)
+    rebuilt = count / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for i in range(count):
+        to = f"user{i}@localhost"
+        server.sendmail(sender, to, template.render(to, otp=f"{i:06d}", minutes=10))
+    templated = count / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for i in range(count):
+        template.render(f"user{i}@localhost", otp=f"{i:06d}", minutes=10)
+    render_only = count / (time.perf_counter() - start)
+    server.quit()
+    print(f"rebuilt per message : {rebuilt:10.0f} msg/s")
+    print(f"template + sendmail : {templated:10.0f} msg/s")
+    print(f"template render only: {render_only:10.0f} msg/s")
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Measure OTP mail throughput over one SMTP connection.")
+    parser.add_argument("--host")
+    parser.add_argument("--port", type=int, default=8025)
+    parser.add_argument("--count", type=int, default=2000)
+    args = parser.parse_args()
+    if args.host:
+        _benchmark(args.host, args.port, args.count)
+    else:
+        from aiosmtpd.controller import Controller
+        from aiosmtpd.handlers import Sink
+        sink = Controller(Sink(), hostname="127.0.0.1", port=args.port)
+        sink.start()
+        try:
+            _benchmark("127.0.0.1", args.port, args.count)
+        finally:
+            sink.stop()
+print("mailer.py created successfully!")
@@ -0,0 +1,131 @@
+%%writefile passwords.py
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+# ================= CONFIG =================
+# Cost is per deployment; raising it only affects new hashes, and older ones
+# are upgraded the next time their owner signs in.
+SCRYPT_N     = int(os.environ.get('PASSWORD_SCRYPT_N', 2 ** 14))
+SCRYPT_R     = int(os.environ.get('PASSWORD_SCRYPT_R', 8))
+SCRYPT_P     = int(os.environ.get('PASSWORD_SCRYPT_P', 1))
+HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', max(2, (os.cpu_count() or 1) // 2)))
+SALT_BYTES   = 16
+KEY_BYTES    = 32
+SCHEME       = "scrypt"
+
+
+# ================= KDF =================
+# Stored format: scrypt$<n>$<r>$<p>$<salt>$<key>, base64 without padding.
+# Anything else is a legacy unsalted SHA-256 hex digest.
+def _b64(data):
+    return base64.b64encode(data).decode().rstrip("=")
+
+def _unb64(text):
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+def _scrypt(secret, salt, n, r, p):
+    # memory use is 128 * n * r bytes; leave OpenSSL's default cap headroom
+    return hashlib.scrypt(secret.encode(), salt=salt, n=n, r=r, p=p, maxmem=256 * n * r, dklen=KEY_BYTES)
+
+def hash_secret(secret, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P):
+    salt = secrets.token_bytes(SALT_BYTES)
+    return f"{SCHEME}${n}${r}${p}${_b64(salt)}${_b64(_scrypt(secret, salt, n, r, p))}"
+
+def verify_secret(secret, stored):
+    # returns (matches, needs_rehash)
+    if not stored:
+        return False, False
+    if not stored.startswith(SCHEME + "$"):
+        legacy = hashlib.sha256(secret.encode()).hexdigest()
+        return hmac.compare_digest(legacy, stored), True
+    _, n, r, p, salt, key = stored.split("$")
+    n, r, p = int(n), int(r), int(p)
+    matches = hmac.compare_digest(_scrypt(secret, _unb64(salt), n, r, p), _unb64(key))
+    return matches, (n, r, p) != (SCRYPT_N, SCRYPT_R, SCRYPT_P)
+
+
+# ================= WORKER POOL =================
+# hashlib.scrypt releases the GIL, so a few threads hash in parallel while the
+# pool bounds how many KDF runs (and their memory) happen at once.
+_pool = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="kdf")
+
+def hash_password(secret):
+    return _pool.submit(hash_secret, secret).result()
+
+def verify_password(secret, stored):
+    return _pool.submit(verify_secret, secret, stored).result()
+
+def matches_any(secret, stored_hashes):
+    # Password history check: legacy digests are compared inline, the scrypt
+    # ones run concurrently, and the first match cancels whatever hasn't started.
+    pending = set()
+    for stored in dict.fromkeys(stored_hashes):
+        if not stored.startswith(SCHEME + "$"):
+            if verify_secret(secret, stored)[0]:
+                return True
+        else:
+            pending.add(_pool.submit(verify_secret, secret, stored))
+    try:
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            if any(future.result()[0] for future in done):
+                return True
+        return False
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+# ================= BENCHMARK =================
+# python passwords.py [--seconds 3] [--costs 12 14 15 16] [--history 5 10]
+# Logins/sec is how many verify_password calls the pool completes per second;
+# the history rows compare a no-match reuse check run in sequence vs matches_any.
+def _benchmark_history(depths, rounds=3):
+    import time
+    print(f"password history check, n=2^{SCRYPT_N.bit_length() - 1}")
+    for depth in depths:
+        stored = [hash_secret(f"old password {i}") for i in range(depth)]
+        start  = time.perf_counter()
+        for _ in range(rounds):
+            any(verify_secret("new password", h)[0] for h in stored)
+        sequential = (time.perf_counter() - start) / rounds * 1000
+        start = time.perf_counter()
+        for _ in range(rounds):
+            matches_any("new password", stored)
+        concurrent = (time.perf_counter() - start) / rounds * 1000
+        print(f"depth {depth:<3} {sequential:8.1f} ms sequential  {concurrent:8.1f} ms concurrent")
+
+def _benchmark(costs, seconds):
+    import time
+    print(f"{HASH_WORKERS} hash workers, r={SCRYPT_R}, p={SCRYPT_P}")
+    for log_n in costs:
+        n      = 2 ** log_n
+        stored = hash_secret("correct horse", n=n)
+        start  = time.perf_counter()
+        single = 0
+        while time.perf_counter() - start < seconds / 2:
+            verify_secret("correct horse", stored)
+            single += 1
+        single_ms = (time.perf_counter() - start) / single * 1000
+        start = time.perf_counter()
+        done  = 0
+        while time.perf_counter() - start < seconds / 2:
+            futures = [_pool.submit(verify_secret, "correct horse", stored) for _ in range(HASH_WORKERS * 2)]
+            done   += sum(1 for f in futures if f.result()[0])
+        rate = done / (time.perf_counter() - start)
+        print(f"n=2^{log_n:<3} {128 * n * SCRYPT_R // 2 ** 20:5d} MiB  {single_ms:8.1f} ms/hash  {rate:8.1f} logins/s")
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Measure password verification throughput per scrypt cost.")
+    parser.add_argument("--costs", type=int, nargs="+", default=[12, 13, 14, 15, 16], help="log2 of the scrypt n parameter")
+    parser.add_argument("--seconds", type=float, default=2.0, help="time spent per cost")
+    parser.add_argument("--history", type=int, nargs="*", default=[1, 5, 10], help="password history depths to time")
+    args = parser.parse_args()
+    _benchmark(args.costs, args.seconds)
+    _benchmark_history(args.history)
+print("passwords.py created successfully!")
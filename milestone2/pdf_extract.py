@@ -0,0 +1,67 @@
+%%writefile pdf_extract.py
+import io
+import os
+import tempfile
+import PyPDF2
+from workers import pool_or_temporary
+
+# ================= CONFIG =================
+PDF_WORKERS        = int(os.environ.get('PDF_WORKERS', os.cpu_count() or 1))
+PARALLEL_MIN_PAGES = 16
+
+# ================= WORKER =================
+# The upload is written once to a temp file and tasks carry only its path and
+# a page range. A worker parses the file on its first range and reuses the
+# reader for the ranges that follow; the reader is dropped after the last
+# range of the document and whenever a task names another file.
+_reader = (None, None)
+
+def _extract_pages(path, start, stop, total):
+    global _reader
+    if _reader[0] != path:
+        _reader = (None, None)
+        _reader = (path, PyPDF2.PdfReader(path))
+    pages = _reader[1].pages
+    try:
+        return [pages[index].extract_text() or "" for index in range(start, stop)]
+    finally:
+        if stop == total:
+            _reader = (None, None)
+
+# ================= EXTRACTION =================
+def iter_pdf_pages(data, workers=PDF_WORKERS, pool=None):
+    reader = PyPDF2.PdfReader(io.BytesIO(data))
+    total  = len(reader.pages)
+    if workers <= 1 or total < PARALLEL_MIN_PAGES:
+        for index, page in enumerate(reader.pages):
+            yield index, total, page.extract_text() or ""
+        return
+
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+        f.write(data)
+        path = f.name
+    step = max(1, -(-total // (workers * 4)))
+    try:
+        with pool_or_temporary(pool, min(workers, total)) as executor:
+            futures = [executor.submit(_extract_pages, path, start, min(start + step, total), total)
+                       for start in range(0, total, step)]
+            try:
+                index = 0
+                for future in futures:
+                    for text in future.result():
+                        yield index, total, text
+                        index += 1
+            finally:
+                for future in futures:
+                    future.cancel()
+    finally:
+        os.unlink(path)
+
+def extract_pdf_text(data, progress=None, workers=PDF_WORKERS, pool=None):
+    pages = []
+    for index, total, text in iter_pdf_pages(data, workers, pool):
+        pages.append(text)
+        if progress:
+            progress(index + 1, total)
+    return "\n".join(pages), len(pages)
+print("pdf_extract.py created successfully!")
@@ -0,0 +1,141 @@
+%%writefile rate_limit.py
+import atexit
+import collections
+import os
+import threading
+import time
+import database
+
+# ================= CONFIG =================
+CLIENT_MAX_ATTEMPTS = int(os.environ.get('CLIENT_MAX_LOGIN_ATTEMPTS', 20))
+FLUSH_INTERVAL      = float(os.environ.get('RATE_LIMIT_FLUSH_INTERVAL', 2.0))
+
+
+# ================= LIMITER =================
+# Failed logins are kept in memory as a sliding window of timestamps per key;
+# failures older than the lockout drop out of the window. A key that collects
+# max_attempts failures inside the window is locked for lockout seconds after
+# the last one, then starts over with an empty window.
+# Email windows are written behind to login_attempts in batches and reloaded
+# on startup; client windows only live in this process.
+class _Window:
+    __slots__ = ("times", "locked_until")
+
+    def __init__(self):
+        self.times        = collections.deque()
+        self.locked_until = 0.0
+
+
+class LoginRateLimiter:
+    def __init__(self, pool, max_attempts, lockout, client_max_attempts=CLIENT_MAX_ATTEMPTS, flush_interval=FLUSH_INTERVAL):
+        self.pool                = pool
+        self.max_attempts        = max_attempts
+        self.lockout             = lockout
+        self.client_max_attempts = client_max_attempts
+        self._lock    = threading.Lock()
+        self._emails  = {}
+        self._clients = {}
+        self._dirty   = set()
+        self._load()
+        self._stop    = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, args=(flush_interval,), daemon=True)
+        self._flusher.start()
+        atexit.register(self.close)
+
+    def _load(self):
+        cutoff = time.time() - self.lockout
+        with self.pool.connection(write=True) as conn:
+            conn.execute(database.EXPIRE_ATTEMPTS_SQL, (cutoff,))
+            rows = conn.execute(database.LOAD_ATTEMPTS_SQL).fetchall()
+        for email, attempts, last_attempt in rows:
+            window = self._emails[email] = _Window()
+            window.times.extend([last_attempt] * min(attempts, self.max_attempts))
+            if attempts >= self.max_attempts:
+                window.locked_until = last_attempt + self.lockout
+
+    def _current(self, windows, key, now):
+        window = windows.get(key)
+        if window is None:
+            return None
+        if window.locked_until:
+            if now < window.locked_until:
+                return window
+            window.times.clear()
+            window.locked_until = 0.0
+        while window.times and now - window.times[0] >= self.lockout:
+            window.times.popleft()
+        if not window.times:
+            del windows[key]
+            return None
+        return window
+
+    def _record(self, windows, key, limit, now):
+        window = self._current(windows, key, now) or windows.setdefault(key, _Window())
+        window.times.append(now)
+        if len(window.times) >= limit:
+            window.locked_until = now + self.lockout
+
+    def attempts(self, email):
+        with self._lock:
+            window = self._current(self._emails, email, time.time())
+            return len(window.times) if window else 0
+
+    def is_limited(self, email, client=None):
+        now   = time.time()
+        until = 0.0
+        with self._lock:
+            for windows, key in ((self._emails, email), (self._clients, client)):
+                window = self._current(windows, key, now) if key is not None else None
+                if window:
+                    until = max(until, window.locked_until)
+        return until > now, max(0.0, until - now)
+
+    def record_failure(self, email, client=None):
+        now = time.time()
+        with self._lock:
+            self._record(self._emails, email, self.max_attempts, now)
+            if client is not None:
+                self._record(self._clients, client, self.client_max_attempts, now)
+            self._dirty.add(email)
+
+    def reset(self, email):
+        with self._lock:
+            if self._emails.pop(email, None) is not None:
+                self._dirty.add(email)
+
+    # ================= WRITE-BEHIND =================
+    def flush(self):
+        now = time.time()
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            upserts, deletes = [], []
+            for email in dirty:
+                window = self._current(self._emails, email, now)
+                if window:
+                    upserts.append((email, len(window.times), window.times[-1]))
+                else:
+                    deletes.append((email,))
+        if not dirty:
+            return 0
+        try:
+            with self.pool.connection(write=True) as conn:
+                conn.executemany(database.SAVE_ATTEMPTS_SQL, upserts)
+                conn.executemany(database.DELETE_BY_EMAIL_SQL.format(table="login_attempts"), deletes)
+        except Exception:
+            # keep the keys dirty so the next flush retries them
+            with self._lock:
+                self._dirty |= dirty
+            raise
+        return len(dirty)
+
+    def _flush_loop(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.flush()
+            except Exception:
+                pass
+
+    def close(self):
+        self._stop.set()
+        self.flush()
+print("rate_limit.py created successfully!")
@@ -1,21 +1,526 @@
 %%writefile readability.py
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+import numpy as np
 import textstat
+from workers import pool_or_temporary
 
+# ================= TOKENIZATION =================
+# The same patterns textstat uses, so counts line up with its formulas.
+_SENTENCE_RE = re.compile(r"\b[^.!?]+[.!?]*", re.UNICODE)
+_PUNCT_RE    = re.compile(r"[^\w\s']|'(?![tsd]|ve|ll|re)", re.UNICODE)
+_SPACE_RE    = re.compile(r"\s", re.UNICODE)
+_CONTRACTION_RE = re.compile(r"[tsd]|ve|ll|re")
+# A terminator followed by whitespace always ends a _SENTENCE_RE match, so
+# cutting there yields exactly the same sentences as scanning the whole text.
+_BOUNDARY_RE = re.compile(r"[.!?]+\s+")
+
+# Documents at least this long are split into chunks and counted in parallel
+PARALLEL_MIN_CHARS = 1_000_000
+CHUNK_CHARS        = 256_000
+PARALLEL_WORKERS   = int(os.environ.get('READABILITY_WORKERS', os.cpu_count() or 1))
+
+# Distinct words whose syllable count / difficulty is kept per process
+WORD_CACHE_SIZE = int(os.environ.get('READABILITY_WORD_CACHE_SIZE', 50_000))
+
+# Counts match textstat (0.7.x) exactly, so scores agree with calling it
+# directly up to floating-point summation order.
+SCORE_TOLERANCE = 1e-9
+
+# Bump whenever counting or a formula changes; cached scores from an older
+# engine are dropped instead of served.
+ENGINE_VERSION = 3
+
+
+class TextCounts:
+    def __init__(self):
+        self.sentences       = 0
+        self.short_sentences = 0
+        self.words           = 0
+        self.syllables       = 0
+        self.polysyllables   = 0
+        self.letters         = 0
+        self.chars           = 0
+        self.difficult       = set()
+        self.fog_difficult   = 0
+
+    @property
+    def num_sentences(self):
+        # text without a word has no sentence to score
+        if not self.words:
+            return 0
+        return max(1, self.sentences - self.short_sentences)
+
+    def merge(self, other):
+        self.sentences       += other.sentences
+        self.short_sentences += other.short_sentences
+        self.words           += other.words
+        self.syllables       += other.syllables
+        self.polysyllables   += other.polysyllables
+        self.letters         += other.letters
+        self.chars           += other.chars
+        self.difficult       |= other.difficult
+        self.fog_difficult   += other.fog_difficult
+        return self
+
+
+# ================= WORD CACHE =================
+# Shared by every analyzer in the process; policy text reuses the same few
+# thousand words, so most lookups skip textstat's dictionary and heuristics.
+class WordCache:
+    def __init__(self, capacity=WORD_CACHE_SIZE):
+        self.capacity  = capacity
+        self.hits      = 0
+        self.misses    = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, word):
+        with self._lock:
+            info = self._data.get(word)
+            if info is not None:
+                self._data.move_to_end(word)
+                self.hits += 1
+                return info
+            self.misses += 1
+        info = (textstat.syllable_count(word), textstat.is_difficult_word(word))
+        with self._lock:
+            self._data[word] = info
+            self._evict()
+        return info
+
+    def _evict(self):
+        while len(self._data) > self.capacity:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def resize(self, capacity):
+        with self._lock:
+            self.capacity = capacity
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "capacity": self.capacity,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+word_cache = WordCache()
+
+def set_word_cache_capacity(capacity):
+    word_cache.resize(capacity)
+
+def word_cache_stats():
+    return word_cache.stats()
+
+
+def _word_info(word, cache):
+    # cache is per document, so the shared cache (and its lock) is hit once per distinct word
+    info = cache.get(word)
+    if info is None:
+        info = word_cache.lookup(word)
+        cache[word] = info
+    return info
+
+
+def _add_token(counts, token, cache):
+    counts.words   += 1
+    counts.letters += len(token) - token.count("'")
+    syllables, difficult = _word_info(token.lower(), cache)
+    counts.syllables += syllables
+    if syllables >= 3:
+        counts.polysyllables += 1
+    if difficult:
+        # textstat keeps difficult words case-sensitive; Fog counts every occurrence
+        counts.difficult.add(token)
+        if syllables >= 3:
+            counts.fog_difficult += 1
+
+
+def _clean_gap(text, start, end):
+    # what remove_punctuation leaves of the text between two sentence matches
+    return "".join(
+        ch for i, ch in enumerate(text[start:end], start)
+        if ch.isspace() or (ch == "'" and _CONTRACTION_RE.match(text, i + 1))
+    )
+
+
+def _close_mark(sentence_marks, counts):
+    # the last sentence's held-back word was counted; move its running totals up
+    if sentence_marks:
+        sentence_marks[-1] = sentence_marks[-1][:2] + (counts.words, counts.syllables, counts.polysyllables,
+                                                       counts.letters, counts.fog_difficult)
+
+def count_text(text, sentence_marks=None):
+    # sentence_marks, if given, gets (start, end, words, syllables, polysyllables,
+    # letters, fog_difficult) per sentence, the counts running totals so far
+    counts = TextCounts()
+    counts.chars = len(_SPACE_RE.sub("", text))
+    cache    = {}
+    pending  = None
+    prev_end = 0
+    for match in _SENTENCE_RE.finditer(text):
+        clean  = _PUNCT_RE.sub("", match.group())
+        tokens = clean.split()
+        counts.sentences += 1
+        if len(tokens) <= 2:
+            counts.short_sentences += 1
+        # textstat tokenizes the whole text, so a word only ends at whitespace:
+        # "3.5" and "U.S." are one word even though they span a sentence break
+        if "'" in text[prev_end:match.start()]:
+            lead = (pending or "") + _clean_gap(text, prev_end, match.start())
+        elif pending is not None:
+            lead = pending + (" " if _SPACE_RE.search(text, prev_end, match.start()) else "")
+        else:
+            lead = ""
+        if pending is not None:
+            rest = lead[len(pending):]
+            if rest[:1].isspace() or not (rest or tokens and not clean[0].isspace()):
+                # not glued to this sentence: the previous sentence's last word
+                lead = rest
+                _add_token(counts, pending, cache)
+                _close_mark(sentence_marks, counts)
+        if lead:
+            lead_tokens = lead.split()
+            if lead_tokens and tokens and not lead[-1].isspace() and not clean[0].isspace():
+                tokens[0] = lead_tokens.pop() + tokens[0]
+            tokens = lead_tokens + tokens
+        pending = None
+        if tokens and not clean[-1].isspace():
+            pending = tokens.pop()
+        for token in tokens:
+            _add_token(counts, token, cache)
+        prev_end = match.end()
+        if sentence_marks is not None:
+            sentence_marks.append((match.start(), prev_end, counts.words, counts.syllables,
+                                   counts.polysyllables, counts.letters, counts.fog_difficult))
+    if pending is not None:
+        _add_token(counts, pending, cache)
+        _close_mark(sentence_marks, counts)
+    return counts
+
+
+# ================= CHUNKED MAP-REDUCE =================
+def split_chunks(text, chunk_chars=CHUNK_CHARS):
+    start = 0
+    while len(text) - start > chunk_chars:
+        boundary = _BOUNDARY_RE.search(text, start + chunk_chars)
+        if not boundary:
+            break
+        yield text[start:boundary.end()]
+        start = boundary.end()
+    yield text[start:]
+
+def count_chunks(chunks, workers=PARALLEL_WORKERS, pool=None):
+    counts = TextCounts()
+    if workers <= 1:
+        for chunk in chunks:
+            counts.merge(count_text(chunk))
+        return counts
+    with pool_or_temporary(pool, workers) as executor:
+        for partial in executor.map(count_text, chunks):
+            counts.merge(partial)
+    return counts
+
+def count_text_parallel(text, workers=PARALLEL_WORKERS, chunk_chars=CHUNK_CHARS, pool=None):
+    return count_chunks(split_chunks(text, chunk_chars), workers, pool)
+
+
+# ================= INCREMENTAL COUNTING =================
+# Keeps per-segment counts for a text being edited. Segments are cut at the
+# same boundaries as split_chunks, so their counts sum to count_text(text).
+# An edit re-counts from the last boundary before it up to the first new
+# boundary that lines up with an old one again; everything else is reused.
+def _common_prefix(a, b):
+    lo, hi = 0, min(len(a), len(b))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[lo:mid] == b[lo:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+def _common_suffix(a, b, limit):
+    lo, hi = 0, limit
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[len(a) - mid:len(a) - lo] == b[len(b) - mid:len(b) - lo]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+class IncrementalCounter:
+    def __init__(self):
+        self.text       = ""
+        self.recounted  = 0
+        self._starts    = np.zeros(1, dtype=np.int64)
+        self._segments  = [TextCounts()]
+        self._totals    = TextCounts()
+        self._difficult = Counter()
+
+    def _apply(self, counts, sign):
+        totals = self._totals
+        totals.sentences       += sign * counts.sentences
+        totals.short_sentences += sign * counts.short_sentences
+        totals.words           += sign * counts.words
+        totals.syllables       += sign * counts.syllables
+        totals.polysyllables   += sign * counts.polysyllables
+        totals.letters         += sign * counts.letters
+        totals.chars           += sign * counts.chars
+        totals.fog_difficult   += sign * counts.fog_difficult
+        # a difficult word stays while any segment still contains it
+        for word in counts.difficult:
+            self._difficult[word] += sign
+            if not self._difficult[word]:
+                del self._difficult[word]
+
+    def counts(self):
+        totals = self._totals
+        totals.difficult = self._difficult.keys()
+        return totals
+
+    def update(self, text):
+        old = self.text
+        if text == old:
+            self.recounted = 0
+            return self.counts()
+        prefix = _common_prefix(old, text)
+        suffix = _common_suffix(old, text, min(len(old), len(text)) - prefix)
+        delta  = len(text) - len(old)
+
+        # last boundary strictly before the edit; the edit may extend one that touches it
+        first      = max(0, int(np.searchsorted(self._starts, prefix, "left")) - 1)
+        pos        = int(self._starts[first])
+        change_end = len(text) - suffix
+        starts, segments = [], []
+        resume = len(self._segments)
+        for match in _BOUNDARY_RE.finditer(text, pos):
+            end = match.end()
+            if end >= len(text):
+                break
+            starts.append(pos)
+            segments.append(count_text(text[pos:end]))
+            pos = end
+            if end >= change_end:
+                # from here on the text is the old suffix; stop once we land on an old boundary
+                k = int(np.searchsorted(self._starts, end - delta, "left"))
+                if k < len(self._starts) and self._starts[k] == end - delta and k > first:
+                    resume = k
+                    break
+        else:
+            starts.append(pos)
+            segments.append(count_text(text[pos:]))
+        if resume == len(self._segments) and (not starts or starts[-1] != pos):
+            starts.append(pos)
+            segments.append(count_text(text[pos:]))
+
+        for counts in self._segments[first:resume]:
+            self._apply(counts, -1)
+        for counts in segments:
+            self._apply(counts, 1)
+        self._segments[first:resume] = segments
+        self._starts = np.concatenate((self._starts[:first], np.array(starts, dtype=np.int64), self._starts[resume:] + delta))
+        self.text      = text
+        self.recounted = len(segments)
+        return self.counts()
+
+
+# ================= FORMULAS =================
+def _words_per_sentence(c):
+    return c.words / c.num_sentences
+
+def _syllables_per_word(c):
+    return c.syllables / c.words if c.words else 0.0
+
+def flesch_reading_ease(c):
+    if not c.words or not c.syllables:
+        return 0.0
+    return 206.835 - 1.015 * _words_per_sentence(c) - 84.6 * _syllables_per_word(c)
+
+def flesch_kincaid_grade(c):
+    if not c.words or not c.syllables:
+        return 0.0
+    return 0.39 * _words_per_sentence(c) + 11.8 * _syllables_per_word(c) - 15.59
+
+def smog_index(c):
+    if not c.num_sentences:
+        return 0.0
+    return 1.043 * (30 * (c.polysyllables / c.num_sentences)) ** 0.5 + 3.1291
+
+def gunning_fog(c):
+    if not c.words:
+        return 0.0
+    return 0.4 * (_words_per_sentence(c) + 100 * c.fog_difficult / c.words)
+
+def coleman_liau_index(c):
+    if not c.words or not c.letters:
+        return 0.0
+    return 0.058 * (c.letters / c.words * 100) - 0.296 * (c.num_sentences / c.words * 100) - 15.8
+
+def metrics_from_counts(c):
+    return {
+        "Flesch Reading Ease": flesch_reading_ease(c),
+        "Flesch-Kincaid Grade": flesch_kincaid_grade(c),
+        "SMOG Index": smog_index(c),
+        "Gunning Fog": gunning_fog(c),
+        "Coleman-Liau": coleman_liau_index(c)
+    }
+
+
+# ================= GRADE LEVELS =================
+LEVEL_BOUNDS = (6, 10, 14)
+LEVEL_NAMES  = ("Beginner", "Intermediate", "Advanced", "Expert")
+
+def average_grade(scores):
+    return (scores["Flesch-Kincaid Grade"] + scores["Gunning Fog"] + scores["SMOG Index"] + scores["Coleman-Liau"]) / 4
+
+def grade_level(avg_grade):
+    for bound, name in zip(LEVEL_BOUNDS, LEVEL_NAMES):
+        if avg_grade <= bound:
+            return name
+    return LEVEL_NAMES[-1]
+
+
+# ================= VECTORIZED SCORING =================
+# Same formulas as above over arrays of per-document counts, for scoring
+# many documents at once. difficult_words is the Gunning Fog count
+# (3+ syllables, every occurrence), i.e. TextCounts.fog_difficult.
+def score_arrays(sentences, words, syllables, polysyllables, letters, difficult_words):
+    s    = np.asarray(sentences, dtype=np.float64)
+    w    = np.asarray(words, dtype=np.float64)
+    syl  = np.asarray(syllables, dtype=np.float64)
+    poly = np.asarray(polysyllables, dtype=np.float64)
+    let  = np.asarray(letters, dtype=np.float64)
+    diff = np.asarray(difficult_words, dtype=np.float64)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        wps       = np.where(s > 0, w / s, 0.0)
+        spw       = np.where(w > 0, syl / w, 0.0)
+        has_words = (w > 0) & (syl > 0)
+        fre   = np.where(has_words, 206.835 - 1.015 * wps - 84.6 * spw, 0.0)
+        fk    = np.where(has_words, 0.39 * wps + 11.8 * spw - 15.59, 0.0)
+        smog  = np.where(s > 0, 1.043 * np.sqrt(30 * poly / s) + 3.1291, 0.0)
+        fog   = np.where(w > 0, 0.4 * (wps + 100 * diff / w), 0.0)
+        cl    = np.where((w > 0) & (let > 0), 0.058 * (let / w * 100) - 0.296 * (s / w * 100) - 15.8, 0.0)
+
+    avg_grade = (fk + fog + smog + cl) / 4
+    # side="left" keeps the "<= bound" banding of grade_level
+    level = np.asarray(LEVEL_NAMES)[np.searchsorted(LEVEL_BOUNDS, avg_grade, side="left")]
+    return {
+        "Flesch Reading Ease": fre,
+        "Flesch-Kincaid Grade": fk,
+        "SMOG Index": smog,
+        "Gunning Fog": fog,
+        "Coleman-Liau": cl,
+        "avg_grade": avg_grade,
+        "level": level
+    }
+
+def score_counts(counts_list):
+    return score_arrays(
+        [c.num_sentences for c in counts_list],
+        [c.words for c in counts_list],
+        [c.syllables for c in counts_list],
+        [c.polysyllables for c in counts_list],
+        [c.letters for c in counts_list],
+        [c.fog_difficult for c in counts_list]
+    )
+
+
+# ================= SENTENCE BREAKDOWN =================
+# Per-sentence scores from the same pass that counts the document. A word
+# that textstat joins across a sentence break is counted in the later sentence.
+def sentence_breakdown(text):
+    marks  = []
+    counts = count_text(text, marks)
+    table  = np.array(marks, dtype=np.int64).reshape(-1, 7)
+    per    = np.diff(table[:, 2:], axis=0, prepend=np.zeros((1, 5), dtype=np.int64))
+    words, syllables, polysyllables, letters, fog_difficult = per.T
+    scores = score_arrays(words > 0, words, syllables, polysyllables, letters, fog_difficult)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        poly_ratio = np.where(words > 0, polysyllables / words, 0.0)
+    breakdown = {
+        "start": table[:, 0],
+        "end": table[:, 1],
+        "words": words,
+        "polysyllable_ratio": poly_ratio,
+        "fk_grade": scores["Flesch-Kincaid Grade"],
+        "avg_grade": scores["avg_grade"],
+        "level": scores["level"]
+    }
+    return counts, breakdown
+
+def hardest_sentences(breakdown, n):
+    # indices of the n highest Flesch-Kincaid grades, hardest first
+    fk = np.where(breakdown["words"] > 0, breakdown["fk_grade"], -np.inf)
+    n  = min(n, int(np.count_nonzero(breakdown["words"])))
+    if n <= 0:
+        return np.zeros(0, dtype=np.int64)
+    top = np.argpartition(-fk, n - 1)[:n]
+    return top[np.argsort(-fk[top], kind="stable")]
+
+
+# ================= ANALYZER =================
 class ReadabilityAnalyzer:
-    def __init__(self, text):
+    def __init__(self, text, workers=None, pool=None):
         self.text = text
-        self.num_sentences = textstat.sentence_count(text)
-        self.num_words = textstat.lexicon_count(text, removepunct=True)
-        self.num_syllables = textstat.syllable_count(text)
-        self.complex_words = textstat.difficult_words(text)
-        self.char_count = textstat.char_count(text)
+        if workers is None:
+            workers = PARALLEL_WORKERS if len(text) >= PARALLEL_MIN_CHARS else 1
+        self._set_counts(count_text_parallel(text, workers, pool=pool) if workers > 1 else count_text(text))
 
-    def get_all_metrics(self):
+    def _set_counts(self, counts):
+        self.counts = counts
+        self.num_sentences = counts.num_sentences
+        self.num_words = counts.words
+        self.num_syllables = counts.syllables
+        self.complex_words = len(counts.difficult)
+        self.char_count = counts.chars
+
+    @classmethod
+    def from_counts(cls, text, counts):
+        # counts already taken from text, e.g. by sentence_breakdown
+        analyzer = cls.__new__(cls)
+        analyzer.text = text
+        analyzer._set_counts(counts)
+        return analyzer
+
+    @classmethod
+    def from_summary(cls, text, summary, metrics):
+        analyzer = cls.__new__(cls)
+        analyzer.text = text
+        analyzer.counts = None
+        for key, value in summary.items():
+            setattr(analyzer, key, value)
+        analyzer._metrics = metrics
+        return analyzer
+
+    def summary(self):
         return {
-            "Flesch Reading Ease": textstat.flesch_reading_ease(self.text),
-            "Flesch-Kincaid Grade": textstat.flesch_kincaid_grade(self.text),
-            "SMOG Index": textstat.smog_index(self.text),
-            "Gunning Fog": textstat.gunning_fog(self.text),
-            "Coleman-Liau": textstat.coleman_liau_index(self.text)
+            "num_sentences": self.num_sentences,
+            "num_words": self.num_words,
+            "num_syllables": self.num_syllables,
+            "complex_words": self.complex_words,
+            "char_count": self.char_count
         }
+
+    def get_all_metrics(self):
+        if getattr(self, "_metrics", None) is None:
+            self._metrics = metrics_from_counts(self.counts)
+        return dict(self._metrics)
 print("readability.py created successfully!")
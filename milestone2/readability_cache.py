@@ -0,0 +1,128 @@
+%%writefile readability_cache.py
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import readability
+
+# ================= CONFIG =================
+CACHE_DB          = os.environ.get('READABILITY_CACHE_DB', 'readability_cache.db')
+CACHE_MAX_ENTRIES = int(os.environ.get('READABILITY_CACHE_MAX_ENTRIES', 2000))
+CACHE_TTL_SECONDS = int(os.environ.get('READABILITY_CACHE_TTL', 30 * 24 * 3600))
+
+
+def normalize_text(text):
+    return text.replace("\r\n", "\n").replace("\r", "\n").strip()
+
+def text_hash(text):
+    # keyed by engine version too, so a scoring change never serves old results
+    return f"v{readability.ENGINE_VERSION}:" + hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class ReadabilityCache:
+    def __init__(self, path=CACHE_DB, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl         = ttl
+        self.hits        = 0
+        self.misses      = 0
+        self.evictions   = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+        CREATE TABLE IF NOT EXISTS readability_cache (
+            text_hash TEXT PRIMARY KEY,
+            summary TEXT NOT NULL,
+            metrics TEXT NOT NULL,
+            created_at REAL,
+            last_access REAL
+        )""")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_readability_cache_last_access ON readability_cache(last_access)")
+        stale = self._conn.execute("DELETE FROM readability_cache WHERE text_hash NOT LIKE ?",
+                                   (f"v{readability.ENGINE_VERSION}:%",)).rowcount
+        self.evictions += stale
+        self._conn.commit()
+
+    def get(self, text):
+        key = text_hash(text)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT summary, metrics, created_at FROM readability_cache WHERE text_hash = ?", (key,)
+            ).fetchone()
+            if row and now - row[2] > self.ttl:
+                self._conn.execute("DELETE FROM readability_cache WHERE text_hash = ?", (key,))
+                self._conn.commit()
+                self.evictions += 1
+                row = None
+            if not row:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE readability_cache SET last_access = ? WHERE text_hash = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return readability.ReadabilityAnalyzer.from_summary(text, json.loads(row[0]), json.loads(row[1]))
+
+    def put(self, analyzer):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO readability_cache (text_hash, summary, metrics, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (text_hash(analyzer.text), json.dumps(analyzer.summary()), json.dumps(analyzer.get_all_metrics()), now, now)
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now):
+        expired = self._conn.execute("DELETE FROM readability_cache WHERE created_at < ?", (now - self.ttl,)).rowcount
+        over = self._conn.execute("SELECT COUNT(*) FROM readability_cache").fetchone()[0] - self.max_entries
+        if over > 0:
+            self._conn.execute("""
+            DELETE FROM readability_cache WHERE text_hash IN (
+                SELECT text_hash FROM readability_cache ORDER BY last_access LIMIT ?
+            )""", (over,))
+        self.evictions += expired + max(over, 0)
+
+    def analyze(self, text, pool=None):
+        text = normalize_text(text)
+        analyzer = self.get(text)
+        if analyzer is None:
+            analyzer = readability.ReadabilityAnalyzer(text, pool=pool)
+            self.put(analyzer)
+        return analyzer
+
+    def analyze_with_breakdown(self, text, pool=None):
+        # On a miss the per-sentence breakdown comes out of the same counting
+        # pass as the scores. Hits, and documents large enough to be counted in
+        # parallel chunks, return None for it.
+        text = normalize_text(text)
+        analyzer = self.get(text)
+        breakdown = None
+        if analyzer is None:
+            if len(text) < readability.PARALLEL_MIN_CHARS:
+                counts, breakdown = readability.sentence_breakdown(text)
+                analyzer = readability.ReadabilityAnalyzer.from_counts(text, counts)
+            else:
+                analyzer = readability.ReadabilityAnalyzer(text, pool=pool)
+            self.put(analyzer)
+        return analyzer, breakdown
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM readability_cache")
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM readability_cache").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+print("readability_cache.py created successfully!")
@@ -1,9 +1,13 @@
 %%writefile templates.py
-class Templates:
+import re
+import sys
 
-    @staticmethod
-    def logo():
-        return """
+def _compact(html):
+    # static blocks are built once at import, whitespace-collapsed and interned
+    return sys.intern(re.sub(r">\s+<", "><", re.sub(r"\s+", " ", html)).strip())
+
+class Templates:
+    LOGO = _compact("""
         <div class="logo-container">
             <div class="logo-icon">
                 <svg viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
@@ -13,11 +17,37 @@ class Templates:
             <div class="logo-text">PolicyNav</div>
             <div class="logo-subtext">Secure Access Management</div>
         </div>
-        """
+        """)
+
+    ADMIN_LOGO = _compact("""
+        <div class="logo-container">
+            <div class="logo-icon" style="border-color: #f59e0b; box-shadow: 0 0 20px rgba(245,158,11,0.2);">
+                <svg viewBox="0 0 24 24" fill="none" stroke="#f59e0b" stroke-width="2" style="width:2rem;height:2rem;">
+                    <path d="M12 22s8-4 8-10V5l-8-3-8 3v7c0 6 8 10 8 10z"/>
+                    <path d="M9 12l2 2 4-4"/>
+                </svg>
+            </div>
+            <div class="logo-text">PolicyNav</div>
+            <div class="logo-subtext" style="color: #f59e0b;">Admin Portal</div>
+        </div>""")
+
+    SIDEBAR_BRAND = _compact("""
+        <div style="display:flex; align-items:center; gap:10px; margin-bottom:1rem; padding: 0 10px;">
+            <div style="width:28px;height:28px;border-radius:6px;background:linear-gradient(135deg, #4F8BF9, #3672e0);display:flex;align-items:center;justify-content:center;">
+                <svg viewBox="0 0 24 24" fill="none" stroke="white" stroke-width="2" style="width:16px;height:16px;"><path d="M12 22s8-4 8-10V5l-8-3-8 3v7c0 6 8 10 8 10z"/></svg>
+            </div>
+            <span style="color:#fff;font-weight:600;font-size:1.1rem;letter-spacing:-0.02em;">PolicyNav</span>
+        </div>""")
+
+    DIVIDER = '<div class="divider"></div>'
+
+    @staticmethod
+    def logo():
+        return Templates.LOGO
 
     @staticmethod
     def divider():
-        return '<div class="divider"></div>'
+        return Templates.DIVIDER
 
     @staticmethod
     def info_box(text):
@@ -30,4 +60,18 @@ class Templates:
             Welcome, <span class="username-highlight">{username}</span>!
         </div>
         """
+
+    @staticmethod
+    def otp_email(otp, minutes):
+        return f"""
+        <html>
+        <body style="font-family: Arial, sans-serif; background-color: #0E1117; color: #ffffff; padding: 20px;">
+            <div style="max-width: 400px; margin: 0 auto; background: #1e2530; border: 1px solid #2e3642; border-radius: 10px; padding: 30px;">
+                <h2 style="color: #4F8BF9; text-align: center;">PolicyNav</h2>
+                <p style="text-align: center;">Your OTP for password reset is:</p>
+                <h1 style="color: #4F8BF9; text-align: center; font-size: 36px; letter-spacing: 5px;">{otp}</h1>
+                <p style="text-align: center; color: #8b9bb4;">Valid for {minutes} minutes</p>
+            </div>
+        </body>
+        </html>"""
 print("templates.py created successfully!")
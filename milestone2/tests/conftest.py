@@ -0,0 +1,22 @@
+import glob
+import os
+import sys
+import tempfile
+
+# ================= CELL MODULES =================
+# Every module in milestone2/ is a notebook cell: a %%writefile line, the
+# module, and a closing print. Write them out the way running the cells does
+# and import from there. sys.path is inherited by spawned pool workers, so
+# they import the same copies.
+SOURCE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULE_DIR = tempfile.mkdtemp(prefix="policynav-cells-")
+
+for path in glob.glob(os.path.join(SOURCE_DIR, "*.py")):
+    with open(path, encoding="utf-8") as f:
+        lines = f.read().splitlines(keepends=True)
+    if lines and lines[0].startswith("%%writefile"):
+        lines = lines[1:]
+    with open(os.path.join(MODULE_DIR, os.path.basename(path)), "w", encoding="utf-8") as f:
+        f.writelines(lines)
+
+sys.path.insert(0, MODULE_DIR)
@@ -0,0 +1,59 @@
+import os
+import pytest
+import database
+
+pytest.importorskip("jwt")
+pytest.importorskip("streamlit")
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+APP_PATH = os.path.join(os.path.dirname(database.__file__), "app.py")
+
+@pytest.fixture
+def admin_app(tmp_path, monkeypatch):
+    # app.py opens users.db and the readability cache in the working directory
+    monkeypatch.chdir(tmp_path)
+    st.cache_resource.clear()
+    pool = database.ConnectionPool("users.db")
+    with pool.connection(write=True) as conn:
+        conn.executemany(database.INSERT_USER_SQL, [
+            (name, f"{name}@example.com", "x", "q", "x", "2024-01-01") for name in ("bulkone", "bulktwo", "keeper")
+        ])
+    at = AppTest.from_file(APP_PATH, default_timeout=30)
+    at.session_state["page"] = "admin_login"
+    at.run()
+    at.text_input(key="admin_email").input(os.environ.get('ADMIN_EMAIL', 'admin@policynav.com'))
+    at.text_input(key="admin_pass").input(os.environ.get('ADMIN_PASSWORD', 'Admin@123'))
+    at.button(key="admin_login_btn").click().run()
+    at.session_state["menu_option"] = "Users"
+    at.run()
+    yield at, pool
+
+def _emails(pool):
+    with pool.connection() as conn:
+        return sorted(row[0] for row in conn.execute("SELECT email FROM users"))
+
+def test_search_select_bulk_delete(admin_app):
+    at, pool = admin_app
+    at.text_input(key="admin_search").input("bulk").run()
+    with pool.connection() as conn:
+        uid = conn.execute("SELECT id FROM users WHERE email = ?", ("bulkone@example.com",)).fetchone()[0]
+    at.checkbox(key=f"select_{uid}").check().run()
+    at.button(key="bulk_delete").click().run()
+    assert not at.exception
+    assert at.session_state["confirm_bulk_delete"]
+
+    at.button(key="yes_bulk_del").click().run()
+    assert not at.exception
+    assert _emails(pool) == ["bulktwo@example.com", "keeper@example.com"]
+    assert [message.value for message in at.success] == ["Deleted 1 user(s)"]
+
+def test_bulk_delete_cancel_keeps_users(admin_app):
+    at, pool = admin_app
+    at.text_input(key="admin_search").input("bulk").run()
+    at.radio(key="admin_bulk_scope").set_value("All matching").run()
+    at.button(key="bulk_delete").click().run()
+    at.button(key="no_bulk_del").click().run()
+    assert not at.exception
+    assert "confirm_bulk_delete" not in at.session_state
+    assert len(_emails(pool)) == 3
@@ -0,0 +1,16 @@
+import database
+
+def test_hot_queries_use_indexes_on_a_fresh_database():
+    conn = database.connect(":memory:")
+    database.migrate(conn)
+    assert database.check_query_plans(conn) == []
+
+def test_migrations_are_idempotent(tmp_path):
+    path = str(tmp_path / "users.db")
+    for _ in range(2):
+        conn = database.connect(path)
+        database.migrate(conn)
+        conn.close()
+    conn = database.connect(path)
+    versions = [row[0] for row in conn.execute("SELECT version FROM schema_migrations ORDER BY version")]
+    assert versions == [version for version, _ in database.MIGRATIONS]
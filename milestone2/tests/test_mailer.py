@@ -0,0 +1,89 @@
+import socket
+import time
+import pytest
+import database
+import mailer
+from templates import Templates
+
+pytest.importorskip("aiosmtpd")
+from aiosmtpd.controller import Controller
+
+SENDER = "otp@policynav.test"
+
+class _Inbox:
+    # accepts mail for everyone except refused@ addresses
+    def __init__(self):
+        self.messages = []
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.startswith("refused@"):
+            return "550 5.1.1 No such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append((envelope.mail_from, envelope.rcpt_tos, envelope.content))
+        return "250 Message accepted for delivery"
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+@pytest.fixture
+def inbox():
+    handler    = _Inbox()
+    controller = Controller(handler, hostname="127.0.0.1", port=_free_port())
+    controller.start()
+    yield handler, controller.port
+    controller.stop()
+
+@pytest.fixture
+def pool(tmp_path):
+    return database.ConnectionPool(str(tmp_path / "users.db"))
+
+def _queue_otp(pool, queue, email, otp):
+    # what app.py's save_otp / send_otp_email / set_otp_delivery do
+    with pool.connection(write=True) as conn:
+        conn.execute(database.SAVE_OTP_SQL, (email, otp, time.time() + 600))
+    def on_status(status, error):
+        with pool.connection(write=True) as conn:
+            conn.execute(database.SET_OTP_DELIVERY_SQL, (status, error, email, otp))
+    template = mailer.MessageTemplate(f"PolicyNav <{SENDER}>", "PolicyNav - Password Reset OTP",
+                                      Templates.otp_email(mailer.slot("otp"), mailer.slot("minutes")))
+    assert queue.send((SENDER, email, template.render(email, otp=otp, minutes=10)), on_status)
+
+def _delivery(pool, email):
+    with pool.connection() as conn:
+        return conn.execute(database.OTP_DELIVERY_SQL, (email,)).fetchone()
+
+def test_queued_otp_is_delivered(inbox, pool):
+    handler, port = inbox
+    queue = mailer.MailQueue(SENDER, None, host="127.0.0.1", port=port, starttls=False, backoff=0)
+    _queue_otp(pool, queue, "user@example.com", "123456")
+    assert _delivery(pool, "user@example.com") == ("queued", None)
+    queue.join()
+    assert _delivery(pool, "user@example.com") == ("sent", None)
+    (mail_from, rcpt_tos, content), = handler.messages
+    assert (mail_from, rcpt_tos) == (SENDER, ["user@example.com"])
+    assert b"123456" in content
+
+def test_refused_recipient_is_recorded_as_failed(inbox, pool):
+    handler, port = inbox
+    queue = mailer.MailQueue(SENDER, None, host="127.0.0.1", port=port, starttls=False, backoff=0)
+    _queue_otp(pool, queue, "refused@example.com", "654321")
+    queue.join()
+    status, error = _delivery(pool, "refused@example.com")
+    assert status == "failed"
+    assert "No such user" in error
+    assert handler.messages == []
+    assert (queue.sent, queue.failed) == (0, 1)
+
+def test_unreachable_server_is_recorded_as_failed(pool):
+    queue = mailer.MailQueue(SENDER, None, host="127.0.0.1", port=_free_port(), starttls=False,
+                             max_attempts=2, backoff=0)
+    _queue_otp(pool, queue, "user@example.com", "111111")
+    queue.join()
+    status, error = _delivery(pool, "user@example.com")
+    assert status == "failed"
+    assert error
@@ -0,0 +1,59 @@
+import pytest
+import textstat
+import readability
+
+SAMPLES = [
+    "",
+    "The Government shall provide the committee's annex notwithstanding earlier provisions.",
+    "Short one. Then a considerably more complicated administrative sentence follows it! Why? "
+    "Because e.g. Rs.500 and 4.2 per cent aren't well-known figures... 'tis the season.",
+    "naïve café o'clock rock'n'roll\n\nhyphen-ated -- (annex) i.e. U.S. it's don't",
+]
+
+TEXTSTAT_METRICS = {
+    "Flesch Reading Ease": textstat.flesch_reading_ease,
+    "Flesch-Kincaid Grade": textstat.flesch_kincaid_grade,
+    "SMOG Index": textstat.smog_index,
+    "Gunning Fog": textstat.gunning_fog,
+    "Coleman-Liau": textstat.coleman_liau_index,
+}
+
+@pytest.mark.parametrize("text", SAMPLES)
+def test_matches_textstat(text):
+    analyzer = readability.ReadabilityAnalyzer(text)
+    assert (analyzer.num_sentences, analyzer.num_words, analyzer.num_syllables, analyzer.complex_words, analyzer.char_count) == (
+        textstat.sentence_count(text), textstat.lexicon_count(text), textstat.syllable_count(text),
+        textstat.difficult_words(text), textstat.char_count(text))
+    metrics = analyzer.get_all_metrics()
+    for name, metric in TEXTSTAT_METRICS.items():
+        assert metrics[name] == pytest.approx(metric(text), abs=readability.SCORE_TOLERANCE), name
+
+# textstat counts one sentence in whitespace or punctuation and scores it
+# SMOG 3.1291; text with no words is scored as empty here instead.
+@pytest.mark.parametrize("text", ["", "   \n\t ", "... !? --"])
+def test_text_without_words_scores_zero(text):
+    analyzer = readability.ReadabilityAnalyzer(text)
+    assert analyzer.num_sentences == 0
+    assert analyzer.get_all_metrics() == dict.fromkeys(TEXTSTAT_METRICS, 0.0)
+    assert readability.score_counts([analyzer.counts])["SMOG Index"][0] == 0.0
+
+# Sentences separated by whitespace: each row of the breakdown should be what
+# textstat reports for that sentence on its own.
+BREAKDOWN_TEXT = (
+    "The committee approved the proposal. Implementation requires considerable administrative coordination! "
+    "Was it worth it? Everyone agreed.\n\nA new paragraph begins here with several ordinary words."
+)
+
+def test_sentence_breakdown_matches_each_sentence_alone():
+    _, breakdown = readability.sentence_breakdown(BREAKDOWN_TEXT)
+    assert len(breakdown["start"]) == 5
+    for start, end, words, fk_grade in zip(breakdown["start"], breakdown["end"], breakdown["words"], breakdown["fk_grade"]):
+        sentence = BREAKDOWN_TEXT[start:end]
+        assert words == textstat.lexicon_count(sentence), sentence
+        assert fk_grade == pytest.approx(textstat.flesch_kincaid_grade(sentence), abs=readability.SCORE_TOLERANCE), sentence
+
+def test_word_glued_across_a_break_moves_to_the_later_sentence():
+    # "Laws of the U." | "S." | "apply here." | "They do." -- textstat reads
+    # "U.S." as one word, so it is counted once, with the sentence it ends in
+    _, breakdown = readability.sentence_breakdown("Laws of the U.S. apply here. They do.")
+    assert breakdown["words"].tolist() == [3, 1, 2, 2]
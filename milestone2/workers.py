@@ -0,0 +1,58 @@
+%%writefile workers.py
+import contextlib
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+# ================= CONFIG =================
+POOL_WORKERS = int(os.environ.get('POOL_WORKERS', os.cpu_count() or 1))
+
+# ================= WORKER ENTRY =================
+# spawn starts each worker by re-running sys.modules['__main__']. Under
+# streamlit run that is app.py, so every worker would open the database, run
+# migrations and start the rate-limit flusher before doing any work. Workers
+# are launched with this module standing in as __main__ instead; it imports
+# nothing from the app, and tasks pull in only the modules they reference.
+_main_lock = threading.Lock()
+
+@contextlib.contextmanager
+def _worker_main():
+    with _main_lock:
+        main = sys.modules["__main__"]
+        sys.modules["__main__"] = sys.modules[__name__]
+        try:
+            yield
+        finally:
+            if sys.modules.get("__main__") is sys.modules[__name__]:
+                sys.modules["__main__"] = main
+
+
+# ================= POOL =================
+# A long-lived spawn pool (not fork: the Streamlit server is multi-threaded).
+# Workers are started lazily by submit, so every submit runs under _worker_main;
+# map goes through submit as well.
+class WorkerPool(ProcessPoolExecutor):
+    def __init__(self, max_workers=POOL_WORKERS, **kwargs):
+        super().__init__(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"), **kwargs)
+        self.max_workers = max_workers
+
+    @property
+    def broken(self):
+        # set once a worker dies; the pool then refuses all new work
+        return bool(self._broken)
+
+    def submit(self, fn, /, *args, **kwargs):
+        with _worker_main():
+            return super().submit(fn, *args, **kwargs)
+
+@contextlib.contextmanager
+def pool_or_temporary(pool, workers):
+    # callers without a shared pool (CLI, tests) get one for the call
+    if pool is not None:
+        yield pool
+        return
+    with WorkerPool(workers) as temporary:
+        yield temporary
+print("workers.py created successfully!")